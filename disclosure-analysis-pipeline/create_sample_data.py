@@ -3,9 +3,10 @@
 Quick test script to verify the pipeline setup with earnings call transcript data.
 Creates sample transcript data for testing semantic extraction.
 """
-import json
 from pathlib import Path
 
+import orjson
+
 # Sample earnings call transcript data (dialogue format)
 sample_data = {
     "AAPL": {
@@ -121,8 +122,7 @@ def main():
     output_dir.mkdir(exist_ok=True)
     
     output_file = output_dir / "parsed_data.json"
-    with open(output_file, 'w') as f:
-        json.dump(sample_data, f, indent=2)
+    output_file.write_bytes(orjson.dumps(sample_data, option=orjson.OPT_INDENT_2))
     
     print(f"✅ Created {output_file}")
     print("\nSample data includes:")
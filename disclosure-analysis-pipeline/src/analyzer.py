@@ -4,16 +4,19 @@ Generalized, regime-aware, and signal-safe.
 """
 
 import os
+import asyncio
 import logging
 import re
 import json
-from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import List, Dict, Optional, Tuple
+import orjson
 from dotenv import load_dotenv
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from .cache import ComparisonCache
 from .models import DisclosureChange, SignalClassification
 
 # ---------------------------------------------------------------------
@@ -105,6 +108,51 @@ Quotes must be verbatim.
 """
 
 
+# Templates are parsed once at import; calls only bind variables.
+COMPARISON_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    # Static instructions first, filing text last: keeps the prompt prefix
+    # byte-identical across calls so Gemini's implicit prefix cache can hit.
+    ("human", """Compare the PREVIOUS (text_old) and CURRENT (text_new) versions of each section given below.
+
+Return JSON keyed by section name, with one entry per section given:
+{{
+  "<section name>": {{
+    "changes": [
+      {{
+        "quote_old": "...",
+        "quote_new": "...",
+        "description_of_change": "...",
+        "signal_classification": "Positive" | "Negative" | "Noise"
+      }}
+    ]
+  }}
+}}
+
+SECTIONS:
+{sections}
+""")
+])
+
+VERDICT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a senior investment strategist and credit analyst. 
+Your task is to review a list of quarterly disclosure changes and provide a final synthesis.
+
+Identify the most impactful shifts, ignore the noise, and provide a clear outlook on the company's trajectory.
+"""),
+    ("human", """Review these detected changes in quarterly filings for {company} ({prev_q} -> {curr_q}):
+
+{changes}
+
+Based on these changes, provide:
+1. **Insights & Highlights**: A concise summary of the most important structural shifts and risks.
+2. **Final Verdict**: A clear natural language interpretation of what this means for the company's future.
+3. **Sentiment Signal**: A single label ('Positive', 'Negative', or 'Noise').
+
+Return JSON with keys: 'insights', 'verdict', 'final_signal'.""")
+])
+
+
 # ---------------------------------------------------------------------
 # LLM
 # ---------------------------------------------------------------------
@@ -122,81 +170,147 @@ def create_gemini_llm(temperature: float = 0.1) -> ChatGoogleGenerativeAI:
     )
 
 
+# ---------------------------------------------------------------------
+# Response Parsing
+# ---------------------------------------------------------------------
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def parse_json_object(content: str) -> Optional[Dict]:
+    """
+    Decode the first JSON object in an LLM response.
+
+    Tolerates markdown fences and trailing prose: decoding starts at the first
+    '{' and stops at the end of that object, in a single linear pass.
+    """
+    start = content.find("{")
+    while start != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(content, start)
+        except json.JSONDecodeError:
+            start = content.find("{", start + 1)
+            continue
+        if isinstance(obj, dict):
+            return obj
+        start = content.find("{", start + 1)
+    return None
+
+
 # ---------------------------------------------------------------------
 # Core Comparison
 # ---------------------------------------------------------------------
 
 MIN_SECTION_LENGTH = 100  # Skip placeholder/empty sections
 
-def compare_sections(
-    section_name: str,
-    text_previous: Optional[str],
-    text_current: Optional[str],
-    llm: ChatGoogleGenerativeAI
-) -> Tuple[List[DisclosureChange], Dict]:
+SECTIONS = ["MD&A", "Risk_Factors", "Accounting"]
+
+MAX_CONCURRENT_LLM_CALLS = 16  # Stay under Gemini's per-key rate limits
+
+
+# Near-identical sections can't carry a meaningful change; skip the LLM for them
+TRIVIAL_DIFF_JACCARD = 0.97
+TRIVIAL_DIFF_LENGTH_DELTA = 0.02
+
+
+# Per-side prompt budget. Gemini averages ~4 characters per token on English
+# prose once PDF whitespace runs are collapsed.
+MAX_SECTION_TOKENS = 4000
+CHARS_PER_TOKEN = 4
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+# Figures, percentages and years; any change to these is material
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
     """
-    Returns (List of changes, usage_metadata)
+    Collapse whitespace runs, then cut to ~max_tokens at a word boundary.
     """
-    if (not text_previous or not text_current
-            or len(text_previous) < MIN_SECTION_LENGTH
-            or len(text_current) < MIN_SECTION_LENGTH):
-        return [], {}
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", SYSTEM_PROMPT),
-        ("human", """Compare these two versions of the {section} section.
 
-PREVIOUS:
-{text_old}
+def _is_analyzable(text: Optional[str]) -> bool:
+    return bool(text) and len(text) >= MIN_SECTION_LENGTH
 
-CURRENT:
-{text_new}
 
-Return JSON:
-{{
-  "changes": [
-    {{
-      "section": "{section}",
-      "quote_old": "...",
-      "quote_new": "...",
-      "description_of_change": "...",
-      "signal_classification": "Positive" | "Negative" | "Noise"
-    }}
-  ]
-}}
-""")
-    ])
+def is_trivial_diff(text_previous: str, text_current: str) -> bool:
+    """
+    Cheap pre-filter: word-set Jaccard similarity plus relative length change.
+    Never trivial when the numbers differ ("rose 12%" -> "fell 8%" barely
+    moves the word set). Ordered cheapest-first so long texts are only
+    tokenized when it matters.
+    """
+    if text_previous == text_current:
+        return True
 
-    chain = prompt | llm
-    response = chain.invoke({
-        "section": section_name,
-        "text_old": text_previous[:10000],
-        "text_new": text_current[:10000]
-    })
+    length_delta = abs(len(text_previous) - len(text_current)) / max(len(text_previous), 1)
+    if length_delta >= TRIVIAL_DIFF_LENGTH_DELTA:
+        return False
 
-    usage = getattr(response, "usage_metadata", {})
-    content = response.content if hasattr(response, "content") else str(response)
-    match = re.search(r"\{.*\}", content, re.DOTALL)
-    parsed = json.loads(match.group(0)) if match else {"changes": []}
+    if _NUMBER_RE.findall(text_previous) != _NUMBER_RE.findall(text_current):
+        return False
+
+    words_old = set(_WORD_RE.findall(text_previous.lower()))
+    words_new = set(_WORD_RE.findall(text_current.lower()))
+    shared = len(words_old & words_new)
+    union = len(words_old) + len(words_new) - shared
+    if not union:
+        return True
+
+    return shared / union > TRIVIAL_DIFF_JACCARD
+
+
+def _in_section_order(by_section: Dict[str, List[DisclosureChange]]) -> List[DisclosureChange]:
+    return [c for s in SECTIONS for c in by_section.get(s, [])]
+
+
+# Direct label -> enum lookup; avoids Enum.__call__ per change
+_SIGNALS = {s.value: s for s in SignalClassification}
+
+
+def _normalize_quote(quote: str) -> str:
+    return _WHITESPACE_RE.sub(" ", quote).strip(" \"'“”‘’").lower()
+
+
+def _build_changes(
+    section_name: str,
+    raw_changes: List[Dict],
+    source_old: str,
+    source_new: str
+) -> List[DisclosureChange]:
+    """
+    Apply the verbatim, comparability, dedup and downgrade gates to raw LLM changes.
+    source_old/source_new are the section texts the model was shown.
+    """
+    # Lowercased once per section; every quote is then checked against these
+    haystack_old = source_old.lower()
+    haystack_new = source_new.lower()
 
     results: List[DisclosureChange] = []
     seen_new = set()
     seen_desc = set()
 
-    for ch in parsed.get("changes", []):
+    for ch in raw_changes:
         quote_old = ch.get("quote_old", "").strip()
         quote_new = ch.get("quote_new", "").strip()
         desc = ch.get("description_of_change", "").strip()
-        signal_val = ch.get("signal_classification", "Noise")
-        
-        try:
-            signal = SignalClassification(signal_val)
-        except ValueError:
-            signal = SignalClassification.NOISE
+        signal = _SIGNALS.get(ch.get("signal_classification"), SignalClassification.NOISE)
 
         if not quote_old or not quote_new:
             continue
 
+        # 🔒 Verbatim gate: drop hallucinated quotes
+        if (_normalize_quote(quote_old) not in haystack_old
+                or _normalize_quote(quote_new) not in haystack_new):
+            continue
+
         # 🔒 Regime comparability gate
         if not is_comparable(quote_old, quote_new):
             continue
@@ -221,58 +335,153 @@ Return JSON:
             )
         )
 
-    return results, usage
+    return results
+
+
+async def compare_all_sections(
+    section_texts_old: Dict[str, Optional[str]],
+    section_texts_new: Dict[str, Optional[str]],
+    llm: ChatGoogleGenerativeAI,
+    cache: Optional[ComparisonCache] = None
+) -> Tuple[List[DisclosureChange], Dict]:
+    """
+    Compare every analyzable section of a quarter pair in a single LLM call.
+    Sections already in the cache, or being compared by another concurrent
+    call, are served from it and left out of the prompt.
+    Returns (List of changes, usage_metadata)
+    """
+    by_section: Dict[str, List[DisclosureChange]] = {}
+    cache_keys: Dict[str, bytes] = {}
+    pending: Dict[str, asyncio.Future] = {}
+    sections = {}
+    for section in SECTIONS:
+        text_old = section_texts_old.get(section)
+        text_new = section_texts_new.get(section)
+        if not (_is_analyzable(text_old) and _is_analyzable(text_new)):
+            continue
+
+        if is_trivial_diff(text_old, text_new):
+            logger.info(f"Skipping {section}: trivial diff between quarters")
+            continue
+
+        if cache is not None:
+            key = cache.make_key(section, text_old, text_new)
+            cached = cache.get(key)
+            if cached is not None:
+                by_section[section] = cached
+                continue
+            in_flight = cache.claim(key)
+            if in_flight is not None:
+                pending[section] = in_flight
+                continue
+            cache_keys[section] = key
+
+        sections[section] = {
+            "text_old": truncate_tokens(text_old, MAX_SECTION_TOKENS),
+            "text_new": truncate_tokens(text_new, MAX_SECTION_TOKENS)
+        }
+
+    usage = {}
+    if sections:
+        try:
+            usage = await _run_comparison(sections, llm, by_section, cache, cache_keys)
+        finally:
+            # Unblock waiters on any claimed section that produced no result
+            for key in cache_keys.values():
+                cache.release(key)
+
+    for section, in_flight in pending.items():
+        shared = await in_flight
+        if shared is not None:
+            by_section[section] = shared
+
+    return _in_section_order(by_section), usage
+
+
+async def _run_comparison(
+    sections: Dict[str, Dict[str, str]],
+    llm: ChatGoogleGenerativeAI,
+    by_section: Dict[str, List[DisclosureChange]],
+    cache: Optional[ComparisonCache],
+    cache_keys: Dict[str, bytes]
+) -> Dict:
+    """
+    Send the batched prompt for `sections` and fill `by_section` with the gated
+    changes. Returns usage_metadata.
+    """
+    chain = COMPARISON_PROMPT | llm
+    response = await chain.ainvoke({
+        "sections": json.dumps({"sections": sections}, ensure_ascii=False, indent=2)
+    })
+
+    usage = getattr(response, "usage_metadata", {})
+    content = response.content if hasattr(response, "content") else str(response)
+    parsed = parse_json_object(content) or {}
+
+    for section in sections:
+        section_out = parsed.get(section) or {}
+        by_section[section] = _build_changes(
+            section,
+            section_out.get("changes", []),
+            sections[section]["text_old"],
+            sections[section]["text_new"]
+        )
+        # Only cache sections the model actually answered
+        if cache is not None and section in parsed:
+            cache.put(cache_keys[section], by_section[section])
+
+    return usage
+
+
+async def compare_sections(
+    section_name: str,
+    text_previous: Optional[str],
+    text_current: Optional[str],
+    llm: ChatGoogleGenerativeAI,
+    cache: Optional[ComparisonCache] = None
+) -> Tuple[List[DisclosureChange], Dict]:
+    """
+    Returns (List of changes, usage_metadata)
+    """
+    return await compare_all_sections(
+        {section_name: text_previous},
+        {section_name: text_current},
+        llm,
+        cache
+    )
 
 
 # ---------------------------------------------------------------------
 # Quarter Comparison
 # ---------------------------------------------------------------------
 
-def compare_quarters(
+async def compare_quarters(
     company: str,
     quarter_current: str,
     quarter_previous: str,
     data_current: Dict[str, Optional[str]],
     data_previous: Dict[str, Optional[str]],
-    llm: ChatGoogleGenerativeAI
+    llm: ChatGoogleGenerativeAI,
+    cache: Optional[ComparisonCache] = None
 ) -> Tuple[List[DisclosureChange], Dict]:
     """
-    Returns (List of changes, aggregate usage_metadata).
-    Runs all 3 section comparisons in parallel for speed.
+    Returns (List of changes, usage_metadata).
+    All 3 sections are compared in a single LLM call.
     """
-    all_changes: List[DisclosureChange] = []
-    total_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
-
-    sections = ["MD&A", "Risk_Factors", "Accounting"]
-
-    def compare_one(section):
-        # Create a separate LLM instance per thread for safety
-        section_llm = create_gemini_llm()
-        return compare_sections(
-            section,
-            data_previous.get(section),
-            data_current.get(section),
-            section_llm
-        )
-
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {executor.submit(compare_one, s): s for s in sections}
-        for future in futures:
-            changes, usage = future.result()
-            all_changes.extend(changes)
-            if usage:
-                total_usage["input_tokens"] += usage.get("input_tokens", 0)
-                total_usage["output_tokens"] += usage.get("output_tokens", 0)
-                total_usage["total_tokens"] += usage.get("total_tokens", 0)
-
-    return all_changes, total_usage
+    changes, usage = await compare_all_sections(data_previous, data_current, llm, cache)
+    total_usage = {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0)
+    }
+    return changes, total_usage
 
 
 # ---------------------------------------------------------------------
 # Final Verdict Generation
 # ---------------------------------------------------------------------
 
-def generate_final_verdict(results: List[Dict], llm: ChatGoogleGenerativeAI) -> Tuple[Dict, Dict]:
+async def generate_final_verdict(results: List[Dict], llm: ChatGoogleGenerativeAI) -> Tuple[Dict, Dict]:
     """
     Synthesizes the set of changes into a natural language verdict and a final signal.
     """
@@ -292,30 +501,12 @@ def generate_final_verdict(results: List[Dict], llm: ChatGoogleGenerativeAI) ->
     
     changes_text = "\n\n".join(formatted_changes)
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a senior investment strategist and credit analyst. 
-Your task is to review a list of quarterly disclosure changes and provide a final synthesis.
-
-Identify the most impactful shifts, ignore the noise, and provide a clear outlook on the company's trajectory.
-"""),
-        ("human", """Review these detected changes in quarterly filings for {company} ({prev_q} -> {curr_q}):
-
-{changes}
-
-Based on these changes, provide:
-1. **Insights & Highlights**: A concise summary of the most important structural shifts and risks.
-2. **Final Verdict**: A clear natural language interpretation of what this means for the company's future.
-3. **Sentiment Signal**: A single label ('Positive', 'Negative', or 'Noise').
-
-Return JSON with keys: 'insights', 'verdict', 'final_signal'.""")
-    ])
-
-    chain = prompt | llm
+    chain = VERDICT_PROMPT | llm
     
     # We use the first result to get company/quarter info for the prompt
     sample = results[0]
     
-    response = chain.invoke({
+    response = await chain.ainvoke({
         "company": sample["Company"],
         "prev_q": sample["Quarter_Previous"],
         "curr_q": sample["Quarter_Current"],
@@ -324,8 +515,7 @@ Return JSON with keys: 'insights', 'verdict', 'final_signal'.""")
 
     usage = getattr(response, "usage_metadata", {})
     content = response.content if hasattr(response, "content") else str(response)
-    match = re.search(r"\{.*\}", content, re.DOTALL)
-    parsed = json.loads(match.group(0)) if match else {
+    parsed = parse_json_object(content) or {
         "insights": "Error parsing LLM response",
         "verdict": content,
         "final_signal": "Noise"
@@ -342,15 +532,58 @@ def _has_meaningful_data(quarter_data: Dict[str, Optional[str]]) -> bool:
     """Check if a quarter has any section with enough content to analyze."""
     return any(
         quarter_data.get(s) and len(quarter_data.get(s, "")) >= MIN_SECTION_LENGTH
-        for s in ["MD&A", "Risk_Factors", "Accounting"]
+        for s in SECTIONS
     )
 
 
-def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[List[Dict], Dict]:
+def _quarter_sort_key(quarter: str) -> Tuple[int, int, str]:
+    """
+    Chronological key for labels like 'Q3_2024': (year, quarter number).
+    Unparseable labels sort first, by name.
+    """
+    period, _, year = quarter.partition("_")
+    try:
+        return int(year), int(period.lstrip("Qq")), quarter
+    except ValueError:
+        return 0, 0, quarter
+
+
+def _load_completed_pairs(changes_log: Path) -> Dict[Tuple[str, str, str], List[Dict]]:
+    """
+    Read a changes log into {(company, q_prev, q_curr): results}.
+    A torn last line from a crashed run is ignored.
+    """
+    completed = {}
+    if not changes_log.exists():
+        return completed
+
+    with open(changes_log, "rb") as f:
+        for line in f:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+            key = (entry["Company"], entry["Quarter_Previous"], entry["Quarter_Current"])
+            completed[key] = entry["changes"]
+    return completed
+
+
+async def analyze_all_companies(
+    parsed_data: Dict,
+    dry_run: bool = False,
+    cache_path: Optional[Path] = None,
+    changes_log: Optional[Path] = None,
+    resume: bool = False
+) -> Tuple[List[Dict], Dict]:
     """
     Returns (analysis_summary_dict, aggregate usage_metadata).
     Quarter pairs with empty/placeholder data are skipped.
-    Multiple pairs are analyzed in parallel.
+    Multiple pairs are analyzed concurrently, bounded by MAX_CONCURRENT_LLM_CALLS.
+    Identical section pairs are compared once per run; if cache_path is given,
+    comparisons are also cached there across runs.
+    If changes_log is given, each quarter pair's results are appended to it as a
+    JSONL line as soon as they are ready; with resume=True, pairs already in the
+    log are not re-analyzed.
     """
     llm = None if dry_run else create_gemini_llm()
     results = []
@@ -364,10 +597,7 @@ def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[Lis
             q for q in quarters_data.keys()
             if _has_meaningful_data(quarters_data[q])
         ]
-        quarters = sorted(
-            meaningful_quarters,
-            key=lambda q: (q.split('_')[1], q.split('_')[0]) if '_' in q else q
-        )
+        quarters = sorted(meaningful_quarters, key=_quarter_sort_key)
 
         if len(quarters) < 2:
             logger.info(f"Skipping {company}: fewer than 2 quarters with data")
@@ -381,16 +611,45 @@ def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[Lis
 
             pairs_to_analyze.append((company, q_curr, q_prev, quarters_data))
 
-    # Run uncached pairs in parallel
-    if pairs_to_analyze:
-        def analyze_pair(args):
+    # Pairs already written to the changes log by an interrupted run
+    completed = _load_completed_pairs(changes_log) if resume and changes_log else {}
+    if completed:
+        logger.info(f"Resuming: {len(completed)} quarter pairs already in {changes_log}")
+
+    pair_results_by_index: Dict[int, List[Dict]] = {}
+    remaining = []
+    for index, (company, q_curr, q_prev, quarters_data) in enumerate(pairs_to_analyze):
+        done = completed.get((company, q_prev, q_curr))
+        if done is not None:
+            pair_results_by_index[index] = done
+        else:
+            remaining.append((index, (company, q_curr, q_prev, quarters_data)))
+
+    # Run uncached pairs concurrently, appending each to the log as it finishes
+    if remaining:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+        cache = ComparisonCache(cache_path)
+        cache.preload(
+            cache.make_key(section, quarters_data[q_prev][section], quarters_data[q_curr][section])
+            for _, (_, q_curr, q_prev, quarters_data) in remaining
+            for section in SECTIONS
+            if _is_analyzable(quarters_data[q_prev].get(section))
+            and _is_analyzable(quarters_data[q_curr].get(section))
+        )
+
+        async def analyze_pair(index, args):
             company, q_curr, q_prev, quarters_data = args
-            pair_llm = create_gemini_llm()
-            changes, usage = compare_quarters(
-                company, q_curr, q_prev,
-                quarters_data[q_curr], quarters_data[q_prev],
-                pair_llm
-            )
+            try:
+                async with semaphore:
+                    changes, usage = await compare_quarters(
+                        company, q_curr, q_prev,
+                        quarters_data[q_curr], quarters_data[q_prev],
+                        llm,
+                        cache
+                    )
+            except Exception as e:
+                logger.error(f"Failed to analyze {company} {q_prev}->{q_curr}: {e}")
+                return index, None, {}
             pair_results = []
             for c in changes:
                 pair_results.append({
@@ -403,17 +662,41 @@ def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[Lis
                     "Description": c.description_of_change,
                     "Signal": c.signal_classification.value
                 })
-            return pair_results, usage
+            return index, pair_results, usage
+
+        log_file = None
+        if changes_log:
+            changes_log.parent.mkdir(parents=True, exist_ok=True)
+            log_file = open(changes_log, "ab" if resume else "wb")
 
-        with ThreadPoolExecutor(max_workers=len(pairs_to_analyze)) as executor:
-            futures = [executor.submit(analyze_pair, p) for p in pairs_to_analyze]
-            for future in futures:
-                pair_results, usage = future.result()
-                results.extend(pair_results)
+        try:
+            for next_done in asyncio.as_completed([analyze_pair(i, p) for i, p in remaining]):
+                index, pair_results, usage = await next_done
+                if pair_results is None:
+                    continue
+                pair_results_by_index[index] = pair_results
                 total_usage["input_tokens"] += usage.get("input_tokens", 0)
                 total_usage["output_tokens"] += usage.get("output_tokens", 0)
                 total_usage["total_tokens"] += usage.get("total_tokens", 0)
 
+                if log_file is not None:
+                    company, q_curr, q_prev, _ = pairs_to_analyze[index]
+                    log_file.write(orjson.dumps({
+                        "Company": company,
+                        "Quarter_Previous": q_prev,
+                        "Quarter_Current": q_curr,
+                        "changes": pair_results
+                    }) + b"\n")
+                    log_file.flush()
+        finally:
+            if log_file is not None:
+                log_file.close()
+            cache.close()
+
+    # Reassemble in pair order so output is independent of completion order
+    for index in sorted(pair_results_by_index):
+        results.extend(pair_results_by_index[index])
+
     # Global dedup
     final = []
     seen = set()
@@ -426,7 +709,7 @@ def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[Lis
     # Generate Final Verdict
     if final and not dry_run:
         logger.info("Generating final synthesis and verdict...")
-        verdict, v_usage = generate_final_verdict(final, llm)
+        verdict, v_usage = await generate_final_verdict(final, llm)
 
         total_usage["input_tokens"] += v_usage.get("input_tokens", 0)
         total_usage["output_tokens"] += v_usage.get("output_tokens", 0)
@@ -442,8 +725,7 @@ def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[Lis
 # ---------------------------------------------------------------------
 
 if __name__ == "__main__":
-    with open("output/parsed_data.json") as f:
-        data = json.load(f)
+    data = orjson.loads(Path("output/parsed_data.json").read_bytes())
 
-    out_data, usage = analyze_all_companies(data, dry_run=True)
+    out_data, usage = asyncio.run(analyze_all_companies(data, dry_run=True))
     print(f"Detected {len(out_data['results'])} changes")
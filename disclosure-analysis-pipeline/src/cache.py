@@ -0,0 +1,186 @@
+"""
+Caches of LLM results.
+
+ComparisonCache is keyed on the exact section texts, so re-runs over
+unchanged filings never re-invoke the LLM, and identical section pairs
+within a run (boilerplate repeated across quarters or companies) are only
+compared once. ExtractionCache does the same for semantic extraction of
+whole transcripts.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .models import DisclosureChange, SignalClassification
+
+logger = logging.getLogger(__name__)
+
+# Stay under SQLite's default bound-parameter limit (999) per query
+_SQLITE_MAX_PARAMS = 900
+
+
+class ComparisonCache:
+    """
+    In-process memo of DisclosureChange lists per section comparison,
+    optionally backed by SQLite for persistence across runs.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._memo: Dict[bytes, List[DisclosureChange]] = {}
+        self._in_flight: Dict[bytes, asyncio.Future] = {}
+        self._known_misses: Set[bytes] = set()
+        self._conn = None
+
+        self.path = Path(path) if path else None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path))
+            # Raw 32-byte digests in a WITHOUT ROWID table: the primary-key
+            # B-tree is the table, so each row is stored once at half the key size
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS comparisons "
+                "(key BLOB PRIMARY KEY, changes_json TEXT NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(section_name: str, text_previous: str, text_current: str) -> bytes:
+        """SHA-256 digest of the section name and both texts."""
+        payload = section_name + "\0" + text_previous + "\0" + text_current
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[List[DisclosureChange]]:
+        if key in self._memo:
+            return self._memo[key]
+        if self._conn is None or key in self._known_misses:
+            return None
+
+        row = self._conn.execute(
+            "SELECT changes_json FROM comparisons WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        changes = self._decode(row[0])
+        self._memo[key] = changes
+        return changes
+
+    def preload(self, keys: Iterable[bytes]):
+        """
+        Pull every stored entry among `keys` into the memo in batched queries,
+        so per-section lookups during the run are dict hits.
+        """
+        if self._conn is None:
+            return
+
+        missing = [k for k in set(keys) if k not in self._memo]
+        for i in range(0, len(missing), _SQLITE_MAX_PARAMS):
+            batch = missing[i:i + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, changes_json FROM comparisons WHERE key IN ({placeholders})", batch
+            )
+            for key, changes_json in rows:
+                self._memo[key] = self._decode(changes_json)
+        self._known_misses.update(k for k in missing if k not in self._memo)
+
+    @staticmethod
+    def _decode(changes_json: str) -> List[DisclosureChange]:
+        return [
+            DisclosureChange(**{
+                **d,
+                "signal_classification": SignalClassification(d["signal_classification"])
+            })
+            for d in json.loads(changes_json)
+        ]
+
+    def claim(self, key: bytes) -> Optional[asyncio.Future]:
+        """
+        Register the caller as the one comparing `key`.
+
+        Returns None if the caller now owns the key (and must later `put` or
+        `release` it), or the future of the comparison already in flight.
+        """
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return in_flight
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+        return None
+
+    def put(self, key: bytes, changes: List[DisclosureChange]):
+        self._memo[key] = changes
+        self._resolve(key, changes)
+
+        if self._conn is not None:
+            changes_json = json.dumps(
+                [asdict(c) for c in changes], ensure_ascii=False, separators=(",", ":")
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO comparisons (key, changes_json) VALUES (?, ?)",
+                (key, changes_json)
+            )
+            self._conn.commit()
+
+    def release(self, key: bytes):
+        """Give up a claimed key without a result; waiters receive None."""
+        self._resolve(key, None)
+
+    def _resolve(self, key: bytes, changes: Optional[List[DisclosureChange]]):
+        in_flight = self._in_flight.pop(key, None)
+        if in_flight is not None and not in_flight.done():
+            in_flight.set_result(changes)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+class ExtractionCache:
+    """
+    SQLite store of semantic extraction results ({section: text}) per
+    transcript, so re-parsing unchanged transcripts skips the LLM.
+    """
+
+    _WHITESPACE_RE = re.compile(r"\s+")
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions "
+            "(key BLOB PRIMARY KEY, sections_json TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def make_key(cls, prompt: str, company: str, quarter: str, transcript_text: str) -> bytes:
+        """
+        SHA-256 digest of the extraction prompt, labels and transcript. The
+        transcript is whitespace-collapsed first so re-extracted PDFs whose
+        only difference is line wrapping or spacing still hit.
+        """
+        normalized = cls._WHITESPACE_RE.sub(" ", transcript_text).strip()
+        payload = "\0".join((prompt, company, quarter, normalized))
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, str]]:
+        row = self._conn.execute(
+            "SELECT sections_json FROM extractions WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: bytes, sections: Dict[str, str]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extractions (key, sections_json) VALUES (?, ?)",
+            (key, json.dumps(sections, ensure_ascii=False, separators=(",", ":")))
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
@@ -1,6 +1,7 @@
 """
 Pydantic models for structured LLM output and data validation.
 """
+from dataclasses import dataclass
 from enum import Enum
 from typing import List, Optional
 from pydantic import BaseModel, Field
@@ -13,13 +14,19 @@ class SignalClassification(str, Enum):
     NOISE = "Noise"
 
 
-class DisclosureChange(BaseModel):
-    """A single meaningful change detected between quarters."""
-    section: str = Field(description="Section name: MD&A, Risk_Factors, or Accounting")
-    quote_old: str = Field(description="Specific snippet from previous quarter (verbatim, <100 words)")
-    quote_new: str = Field(description="Specific snippet from current quarter (verbatim, <100 words)")
-    description_of_change: str = Field(description="One-sentence summary of what changed")
-    signal_classification: SignalClassification = Field(description="Positive, Negative, or Noise")
+@dataclass(slots=True, frozen=True)
+class DisclosureChange:
+    """
+    A single meaningful change detected between quarters.
+
+    Plain slotted dataclass: built once per change on the hot path from
+    already-gated LLM output, so Pydantic validation would be pure overhead.
+    """
+    section: str  # MD&A, Risk_Factors, or Accounting
+    quote_old: str  # Verbatim snippet from previous quarter (<100 words)
+    quote_new: str  # Verbatim snippet from current quarter (<100 words)
+    description_of_change: str  # One-sentence summary of what changed
+    signal_classification: SignalClassification  # Positive, Negative, or Noise
 
 
 class SectionComparison(BaseModel):
@@ -1,12 +1,12 @@
 """
 PDF parser for extracting sections from financial disclosure documents.
 """
-import json
 import re
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import orjson
 import pdfplumber
 
 logging.basicConfig(level=logging.INFO)
@@ -146,7 +146,11 @@ def parse_filename(filename: str) -> Optional[Dict[str, str]]:
     return None
 
 
-def parse_all_pdfs(data_dir: str = "data", use_semantic_extraction: bool = True) -> Dict:
+def parse_all_pdfs(
+    data_dir: str = "data",
+    use_semantic_extraction: bool = True,
+    cache_path: Optional[Path] = None
+) -> Dict:
     """
     Parse all PDFs in the data directory.
     Returns nested dict: {company: {quarter: {section: text}}}
@@ -155,6 +159,7 @@ def parse_all_pdfs(data_dir: str = "data", use_semantic_extraction: bool = True)
         data_dir: Directory containing PDF files
         use_semantic_extraction: If True, use AI to extract sections from unstructured transcripts.
                                  If False, use regex-based section detection (for structured SEC filings).
+        cache_path: Optional SQLite file caching semantic extractions across runs
     """
     data_path = Path(data_dir)
     if not data_path.exists():
@@ -171,6 +176,11 @@ def parse_all_pdfs(data_dir: str = "data", use_semantic_extraction: bool = True)
     logger.info(f"Found {len(pdf_files)} PDF files to process")
     logger.info(f"Extraction mode: {'Semantic (AI-based)' if use_semantic_extraction else 'Regex-based (SEC filings)'}")
     
+    extraction_cache = None
+    if use_semantic_extraction and cache_path:
+        from .cache import ExtractionCache
+        extraction_cache = ExtractionCache(cache_path)
+    
     for pdf_path in pdf_files:
         # Parse filename to get company and quarter
         file_info = parse_filename(pdf_path.name)
@@ -195,7 +205,7 @@ def parse_all_pdfs(data_dir: str = "data", use_semantic_extraction: bool = True)
             from .semantic_extraction import extract_semantic_sections
             
             logger.info(f"Using semantic extraction for {company} {quarter}...")
-            sections = extract_semantic_sections(full_text, company, quarter)
+            sections = extract_semantic_sections(full_text, company, quarter, cache=extraction_cache)
         else:
             # For structured SEC filings: use regex-based section detection
             logger.info(f"Using regex-based extraction for {company} {quarter}...")
@@ -206,6 +216,9 @@ def parse_all_pdfs(data_dir: str = "data", use_semantic_extraction: bool = True)
             results[company] = {}
         results[company][quarter] = sections
     
+    if extraction_cache is not None:
+        extraction_cache.close()
+    
     logger.info(f"Successfully parsed data for {len(results)} companies")
     return results
 
@@ -215,8 +228,7 @@ def save_parsed_data(data: Dict, output_path: str = "output/parsed_data.json"):
     output_file = Path(output_path)
     output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    output_file.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
     
     logger.info(f"Saved parsed data to {output_path}")
 
@@ -2,9 +2,10 @@
 Main orchestration pipeline for disclosure change analysis.
 """
 import argparse
-import json
+import asyncio
 import logging
 from pathlib import Path
+import orjson
 import pandas as pd
 from tqdm import tqdm
 
@@ -17,6 +18,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Column order of disclosure_changes.csv / .xlsx
+RESULT_COLUMNS = [
+    "Company", "Quarter_Previous", "Quarter_Current", "Section",
+    "Quote_Old", "Quote_New", "Description", "Signal"
+]
+
+# Low-cardinality columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ["Company", "Quarter_Previous", "Quarter_Current", "Section", "Signal"]
+
+
+def build_changes_frame(changes: list) -> pd.DataFrame:
+    """
+    Build the results DataFrame with a fixed column order and categorical
+    dtypes, instead of letting pandas infer object columns row by row.
+    """
+    df = pd.DataFrame.from_records(changes, columns=RESULT_COLUMNS)
+    return df.astype({col: "category" for col in CATEGORICAL_COLUMNS})
+
 
 def save_styled_excel(df: pd.DataFrame, output_path: Path):
     """
@@ -50,13 +69,22 @@ def save_styled_excel(df: pd.DataFrame, output_path: Path):
     )
     
     headers = list(df.columns)
+
+    # Style objects are built once and shared by every cell that uses them
+    column_fills = []
+    for header in headers:
+        color = column_colors.get(header, "FFFFFF")
+        column_fills.append(PatternFill(start_color=color, end_color=color, fill_type="solid"))
+    header_font = Font(bold=True)
+    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    body_alignment = Alignment(vertical="top", wrap_text=True)
+
     for col_num, header in enumerate(headers, 1):
         cell = ws.cell(row=1, column=col_num, value=header)
-        color = column_colors.get(header, "FFFFFF")
         
-        cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        cell.fill = column_fills[col_num - 1]
+        cell.font = header_font
+        cell.alignment = header_alignment
         cell.border = thin_border
         
         if "Quote" in header or "Description" in header:
@@ -64,14 +92,12 @@ def save_styled_excel(df: pd.DataFrame, output_path: Path):
         else:
             ws.column_dimensions[cell.column_letter].width = 18
             
-    for row_num, row_data in enumerate(df.values, 2):
+    for row_num, row_data in enumerate(df.itertuples(index=False, name=None), 2):
         for col_num, value in enumerate(row_data, 1):
             cell = ws.cell(row=row_num, column=col_num, value=str(value))
-            header = headers[col_num - 1]
-            color = column_colors.get(header, "FFFFFF")
             
-            cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-            cell.alignment = Alignment(vertical="top", wrap_text=True)
+            cell.fill = column_fills[col_num - 1]
+            cell.alignment = body_alignment
             cell.border = thin_border
             
     ws.freeze_panes = "A2"
@@ -83,7 +109,8 @@ def run_pipeline(
     output_dir: str = "output",
     dry_run: bool = False,
     skip_parsing: bool = False,
-    use_semantic: bool = True
+    use_semantic: bool = True,
+    resume: bool = False
 ):
     """
     Run the complete disclosure analysis pipeline.
@@ -95,6 +122,8 @@ def run_pipeline(
         skip_parsing: If True, use existing parsed_data.json
         use_semantic: If True, use AI-based semantic extraction (for earnings transcripts).
                      If False, use regex-based extraction (for structured SEC filings).
+        resume: If True, keep quarter pairs already in disclosure_changes.jsonl
+                from an interrupted run instead of re-analyzing them.
     """
     import time
     start_time = time.time()
@@ -109,15 +138,18 @@ def run_pipeline(
     step1_start = time.time()
     if skip_parsing and parsed_data_path.exists():
         logger.info("Loading existing parsed data...")
-        with open(parsed_data_path, 'r') as f:
-            parsed_data = json.load(f)
+        parsed_data = orjson.loads(parsed_data_path.read_bytes())
         logger.info(f"Loaded data for {len(parsed_data)} companies")
     else:
         logger.info(f"\n{'='*60}")
         logger.info("STEP 1: Parsing PDF Documents")
         logger.info(f"{'='*60}\n")
         
-        parsed_data = parse_all_pdfs(data_dir, use_semantic_extraction=use_semantic)
+        parsed_data = parse_all_pdfs(
+            data_dir,
+            use_semantic_extraction=use_semantic,
+            cache_path=output_path / "extraction_cache.sqlite"
+        )
         
         if not parsed_data:
             logger.error("No data parsed. Check your PDF files and try again.")
@@ -145,7 +177,13 @@ def run_pipeline(
     if dry_run:
         logger.warning("DRY RUN MODE: Will not make actual LLM API calls")
     
-    analysis_data, usage = analyze_all_companies(parsed_data, dry_run=dry_run)
+    analysis_data, usage = asyncio.run(analyze_all_companies(
+        parsed_data,
+        dry_run=dry_run,
+        cache_path=output_path / "comparison_cache.sqlite",
+        changes_log=output_path / "disclosure_changes.jsonl",
+        resume=resume
+    ))
     changes = analysis_data.get("results", [])
     verdict_data = analysis_data.get("verdict")
     
@@ -163,7 +201,7 @@ def run_pipeline(
     
     if not dry_run:
         # Save to CSV
-        df = pd.DataFrame(changes)
+        df = build_changes_frame(changes)
         csv_path = output_path / "disclosure_changes.csv"
         df.to_csv(csv_path, index=False)
         logger.info(f"Saved {len(df)} changes to {csv_path}")
@@ -194,24 +232,32 @@ def run_pipeline(
         logger.info("SUMMARY STATISTICS")
         logger.info("="*60)
         logger.info(f"Total changes detected: {len(df)}")
+
+        # One grouped pass; each breakdown is a marginal of the same counts
+        counts = df.groupby(["Signal", "Section", "Company"], observed=True).size()
+        by_signal, by_section, by_company = (
+            counts.groupby(level=level, observed=True).sum().sort_values(ascending=False)
+            for level in ("Signal", "Section", "Company")
+        )
+
         logger.info(f"\nBy signal classification:")
-        for signal, count in df['Signal'].value_counts().items():
+        for signal, count in by_signal.items():
             logger.info(f"  {signal}: {count}")
         logger.info(f"\nBy section:")
-        for section, count in df['Section'].value_counts().items():
+        for section, count in by_section.items():
             logger.info(f"  {section}: {count}")
         
         # Save summary
         summary = {
             "total_changes": len(df),
-            "by_signal": df['Signal'].value_counts().to_dict(),
-            "by_section": df['Section'].value_counts().to_dict(),
+            "by_signal": by_signal.to_dict(),
+            "by_section": by_section.to_dict(),
+            "by_company": by_company.to_dict(),
             "verdict": verdict_data,
             "usage": usage
         }
         summary_path = output_path / "summary.json"
-        with open(summary_path, 'w') as f:
-            json.dump(summary, f, indent=2)
+        summary_path.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
         logger.info(f"Saved summary to {summary_path}")
     
     timings['Step 3: Output Generation'] = time.time() - step3_start
@@ -272,6 +318,11 @@ def main():
         action="store_true",
         help="Use regex-based extraction (for structured SEC filings). Default is semantic extraction (for earnings transcripts)."
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip quarter pairs already written to disclosure_changes.jsonl by an interrupted run"
+    )
     
     args = parser.parse_args()
     
@@ -280,7 +331,8 @@ def main():
         output_dir=args.output_dir,
         dry_run=args.dry_run,
         skip_parsing=args.skip_parsing,
-        use_semantic=not args.use_regex  # Default to semantic
+        use_semantic=not args.use_regex,  # Default to semantic
+        resume=args.resume
     )
 
 
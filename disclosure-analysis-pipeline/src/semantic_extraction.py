@@ -4,14 +4,17 @@ Uses Gemini to intelligently identify MD&A, Risk, and Accounting-related discuss
 """
 import os
 import logging
-import json
 import re
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
+from .cache import ExtractionCache
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,13 +22,16 @@ logger = logging.getLogger(__name__)
 
 class ExtractedSections(BaseModel):
     """Semantically extracted sections from earnings call transcript."""
-    md_a_content: str = Field(
+    md_a_content: Optional[str] = Field(
+        default="",
         description="Key discussions about business performance, revenue drivers, operations, margins, growth, strategy, and management commentary on results"
     )
-    risk_factors_content: str = Field(
+    risk_factors_content: Optional[str] = Field(
+        default="",
         description="Discussions about risks, challenges, concerns, headwinds, uncertainties, competitive threats, regulatory issues, and potential problems"
     )
-    accounting_content: str = Field(
+    accounting_content: Optional[str] = Field(
+        default="",
         description="Discussions about accounting policies, estimates, critical accounting decisions, revenue recognition, depreciation, reserves, or financial methodology changes"
     )
 
@@ -233,45 +239,10 @@ Accounting:
 """
 
 
-def create_extraction_llm() -> ChatGoogleGenerativeAI:
-    """Create Gemini LLM for extraction."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables")
-    
-    return ChatGoogleGenerativeAI(
-        model="gemini-3-flash-preview",
-        temperature=0.1,  # Low temperature for consistent extraction
-        google_api_key=api_key,
-        convert_system_message_to_human=True  # Required for system prompts
-    )
-
-
-def extract_semantic_sections(transcript_text: str, company: str, quarter: str) -> Dict[str, str]:
-    """
-    Use Gemini to semantically extract MD&A, Risk, and Accounting content from transcript.
-    
-    Args:
-        transcript_text: Full earnings call transcript text
-        company: Company ticker
-        quarter: Quarter label (e.g., "Q1_2024")
-        
-    Returns:
-        Dict with keys: MD&A, Risk_Factors, Accounting
-    """
-    logger.info(f"Extracting semantic sections for {company} {quarter}...")
-    
-    # Truncate if too long (keep first ~80% to stay in context window)
-    max_chars = 80000  # ~20k tokens
-    if len(transcript_text) > max_chars:
-        logger.warning(f"Transcript is {len(transcript_text)} chars, truncating to {max_chars}")
-        transcript_text = transcript_text[:max_chars] + "\n\n[... remainder truncated ...]"
-    
-    llm = create_extraction_llm()
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", EXTRACTION_PROMPT),
-        ("human", """Analyze this earnings call transcript and extract the three content categories.
+# Parsed once at import; the chain is built once per process
+EXTRACTION_CHAT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", EXTRACTION_PROMPT),
+    ("human", """Analyze this earnings call transcript and extract the three content categories.
 
 Company: {company}
 Quarter: {quarter}
@@ -287,10 +258,76 @@ Return your analysis as a JSON object with this structure:
 }}
 
 Return ONLY valid JSON, no markdown formatting or extra text.""")
-    ])
-    
-    chain = prompt | llm
+])
+
+
+# Verbatim quotes from one CHUNK_CHARS window (~5k tokens), with room for the
+# quotes the duplication rule repeats under Risk Factors
+EXTRACTION_MAX_OUTPUT_TOKENS = 8192
+
+
+@lru_cache(maxsize=1)
+def create_extraction_llm() -> ChatGoogleGenerativeAI:
+    """Create Gemini LLM for extraction (one shared client per process)."""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables")
     
+    return ChatGoogleGenerativeAI(
+        model="gemini-3-flash-preview",
+        temperature=0.1,  # Low temperature for consistent extraction
+        max_output_tokens=EXTRACTION_MAX_OUTPUT_TOKENS,  # Bound run-on outputs
+        n=1,
+        google_api_key=api_key,
+        convert_system_message_to_human=True  # Required for system prompts
+    )
+
+
+@lru_cache(maxsize=1)
+def get_extraction_chain():
+    """Extraction prompt piped into the shared LLM, reused across transcripts."""
+    return EXTRACTION_CHAT_PROMPT | create_extraction_llm()
+
+
+# Long transcripts are split into overlapping windows extracted in parallel,
+# so the Q&A tail (where most risk/accounting discussion lives) is not dropped
+CHUNK_CHARS = 20000  # ~5k tokens
+CHUNK_OVERLAP_CHARS = 2000
+MAX_CHUNK_WORKERS = 4
+
+# Field in the LLM's JSON -> section key returned to the parser
+_FIELD_SECTIONS = {
+    "md_a_content": "MD&A",
+    "risk_factors_content": "Risk_Factors",
+    "accounting_content": "Accounting",
+}
+_NO_DISCUSSION_PREFIX = "no significant discussion"
+_FENCE_RE = re.compile(r'```(?:json)?\s*(\{.*\})\s*```', re.DOTALL)
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _chunk_transcript(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP_CHARS):
+    """Yield overlapping windows of `text`, breaking at a newline where possible."""
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Prefer ending on a line break in the back half of the window
+            newline = text.rfind("\n", start + size // 2, end)
+            if newline != -1:
+                end = newline + 1
+        yield text[start:end]
+        if end == len(text):
+            break
+        start = end - overlap
+
+
+def _extract_chunk(chain, company: str, quarter: str, transcript_text: str) -> Optional[Dict[str, str]]:
+    """
+    Run extraction on one transcript window. Returns the ExtractedSections fields,
+    {} if the response held no JSON, or None if the call failed.
+    """
     try:
         response = chain.invoke({
             "company": company,
@@ -302,48 +339,124 @@ Return ONLY valid JSON, no markdown formatting or extra text.""")
         content = response.content if hasattr(response, 'content') else str(response)
         
         # Remove markdown code fences if present
-        json_match = re.search(r'```(?:json)?\s*(\{.*?})\s*```', content, re.DOTALL)
+        json_match = _FENCE_RE.search(content)
         if json_match:
             json_str = json_match.group(1)
         else:
-            # Try to find raw JSON
-            json_match = re.search(r'\{.*?\}', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
+            # Try to find raw JSON (outermost braces, so "}" inside a quote can't cut it short)
+            start, end = content.find("{"), content.rfind("}")
+            if start != -1 and end > start:
+                json_str = content[start:end + 1]
             else:
                 # JSON not found, log and return empty
                 logger.warning(f"Could not find JSON in response for {company} {quarter}")
                 logger.debug(f"Response content: {content[:500]}...")
-                return {
-                    "MD&A": "No MD&A content extracted",
-                    "Risk_Factors": "No risk factors extracted",
-                    "Accounting": "No accounting content extracted"
-                }
-        
-        parsed = json.loads(json_str)
-        
-        md_a = parsed.get("md_a_content", "")
-        risk_factors = parsed.get("risk_factors_content", "")
-        accounting = parsed.get("accounting_content", "")
+                return {}
         
-        logger.info(f"✓ Extracted sections for {company} {quarter}")
-        logger.info(f"  MD&A: {len(md_a)} chars")
-        logger.info(f"  Risk Factors: {len(risk_factors)} chars")
-        logger.info(f"  Accounting: {len(accounting)} chars")
-        
-        return {
-            "MD&A": md_a,
-            "Risk_Factors": risk_factors,
-            "Accounting": accounting
-        }
+        # Parsed and validated in one pass by pydantic-core; missing fields default to ""
+        return ExtractedSections.model_validate_json(json_str).model_dump()
     
     except Exception as e:
         logger.error(f"Error extracting sections for {company} {quarter}: {e}")
+        return None
+
+
+def _merge_field(values: List[str]) -> str:
+    """
+    Join one field across windows, dropping "no discussion" placeholders when
+    any window found content, and paragraphs repeated from the window overlap.
+    """
+    values = [v.strip() for v in values if v and v.strip()]
+    found = [v for v in values if not v.lower().startswith(_NO_DISCUSSION_PREFIX)]
+    if not found:
+        return values[0] if values else ""
+
+    # Adjacent windows overlap, so the same passage can come back from both:
+    # keep each paragraph once, skipping any already contained in kept text
+    kept, seen = [], ""
+    for value in found:
+        for paragraph in _PARAGRAPH_SPLIT_RE.split(value):
+            normalized = _WHITESPACE_RE.sub(" ", paragraph).strip().lower()
+            if not normalized or normalized in seen:
+                continue
+            kept.append(paragraph.strip())
+            seen += normalized + "\n"
+    return "\n\n".join(kept)
+
+
+def extract_semantic_sections(
+    transcript_text: str,
+    company: str,
+    quarter: str,
+    cache: Optional[ExtractionCache] = None
+) -> Dict[str, str]:
+    """
+    Use Gemini to semantically extract MD&A, Risk, and Accounting content from transcript.
+    
+    Transcripts longer than CHUNK_CHARS are split into overlapping windows
+    that are extracted in parallel and merged per section.
+    
+    Args:
+        transcript_text: Full earnings call transcript text
+        company: Company ticker
+        quarter: Quarter label (e.g., "Q1_2024")
+        cache: Optional store of earlier extractions; unchanged transcripts are
+               served from it without an LLM call
+        
+    Returns:
+        Dict with keys: MD&A, Risk_Factors, Accounting
+    """
+    cache_key = None
+    if cache is not None:
+        cache_key = ExtractionCache.make_key(EXTRACTION_PROMPT, company, quarter, transcript_text)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✓ Using cached extraction for {company} {quarter}")
+            return cached
+    
+    logger.info(f"Extracting semantic sections for {company} {quarter}...")
+    
+    chain = get_extraction_chain()
+    
+    chunks = list(_chunk_transcript(transcript_text))
+    if len(chunks) == 1:
+        results = [_extract_chunk(chain, company, quarter, chunks[0])]
+    else:
+        logger.info(f"Transcript is {len(transcript_text)} chars, extracting {len(chunks)} windows in parallel")
+        with ThreadPoolExecutor(max_workers=min(len(chunks), MAX_CHUNK_WORKERS)) as executor:
+            results = list(executor.map(
+                lambda chunk: _extract_chunk(chain, company, quarter, chunk), chunks
+            ))
+    
+    parsed = [r for r in results if r is not None]
+    if not parsed:
         return {
             "MD&A": None,
             "Risk_Factors": None,
             "Accounting": None
         }
+    if not any(parsed):
+        return {
+            "MD&A": "No MD&A content extracted",
+            "Risk_Factors": "No risk factors extracted",
+            "Accounting": "No accounting content extracted"
+        }
+    
+    sections = {
+        section: _merge_field([p.get(field, "") for p in parsed])
+        for field, section in _FIELD_SECTIONS.items()
+    }
+    
+    logger.info(f"✓ Extracted sections for {company} {quarter}")
+    logger.info(f"  MD&A: {len(sections['MD&A'])} chars")
+    logger.info(f"  Risk Factors: {len(sections['Risk_Factors'])} chars")
+    logger.info(f"  Accounting: {len(sections['Accounting'])} chars")
+    
+    # Only complete extractions are cached; a failed window is retried next run
+    if cache is not None and len(parsed) == len(results):
+        cache.put(cache_key, sections)
+    
+    return sections
 
 
 if __name__ == "__main__":
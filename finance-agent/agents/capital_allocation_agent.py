@@ -1,39 +1,83 @@
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
 from control.control_plane import run_research_task
-from agents.risk_agent import analyze_risks
-from agents.competitive_agent import analyze_competition
-from vertex import call_gemini
+from agents.financial_agent import FINANCIAL_SEARCH_K
+from agents.risk_agent import aanalyze_risks, RISK_SEARCH_QUERY, RISK_SEARCH_K
+from agents.competitive_agent import analyze_competition, COMPETITIVE_SEARCH_QUERY, COMPETITIVE_SEARCH_K
+from tools.retrieve import batch_search_financials
+from pydantic import BaseModel, Field, ValidationError
+from vertex import acall_gemini, exact_cache_only
 import json
 
-def model_capital_allocation(task: str) -> str:
+
+# Shared by the single-company prompt and the marshaled multi-company prompt
+CIO_INSTRUCTIONS = """
+    Synthesize these inputs into a structured Capital Deployment Framework.
+
+    Output Format (Markdown):
+
+    # Capital Allocation Strategy: [Company/Topic]
+
+    ## 1. Capital Thesis
+    (The core argument for how capital should be deployed - e.g., heavy R&D, dividends, M&A)
+
+    ## 2. Scenario Modeling
+    *   **Base Case**: (Most likely outcome given current trends)
+    *   **Bull Case**: (Upside drivers - e.g., successful AI monetization, margin expansion)
+    *   **Bear Case**: (Downside realization - e.g., regulatory crackdown, comp losses)
+
+    ## 3. Recommended Capital Posture
+    (e.g., "Overweight Investment in AI Infra", "Defensive Balance Sheet Management")
+
+    ## 4. Key Sensitivities
+    (What variables move the needle most?)
+
+    ## 5. Diligence Questions
+    (What is still unknown?)
+
+    Cite the sources provided in the reports.
     """
-    Synthesize a Capital Allocation Strategy by orchestrating
-    Research, Risk, and Competitive agents in parallel.
+
+# Companies per marshaled prompt; past ~6 the single long generation
+# outweighs the round trips saved
+MARSHAL_BATCH_SIZE = 6
+
+
+class CompanyReport(BaseModel):
+    company: str
+    report: str = Field(description="The full Markdown Capital Allocation Strategy for this company.")
+
+
+class CompanyReports(BaseModel):
+    reports: list[CompanyReport]
+
+
+async def agather_intelligence(task: str) -> str:
+    """
+    Run the Research, Risk, and Competitive agents in parallel and format
+    their outputs as the intelligence-report block of the CIO prompt.
     """
 
+    # 0. Embed all three agents' search queries in one request; the agents'
+    # own search_financials calls are then served from the search cache
+    await asyncio.to_thread(
+        batch_search_financials,
+        [task, RISK_SEARCH_QUERY.format(task=task), COMPETITIVE_SEARCH_QUERY.format(task=task)],
+        max(FINANCIAL_SEARCH_K, RISK_SEARCH_K, COMPETITIVE_SEARCH_K),
+    )
+
     # 1. Gather Intelligence (Parallel Execution)
+    # The research and competitive agents are synchronous, so they run in worker threads
     print(f"  [Capital Agent] Running Research + Risk + Competition in parallel for: {task}")
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        future_research = executor.submit(run_research_task, task)
-        future_risk = executor.submit(analyze_risks, task)
-        future_comp = executor.submit(analyze_competition, task)
-
-        research_json = future_research.result()
-        risk_report = future_risk.result()
-        comp_report = future_comp.result()
+    research_json, risk_report, comp_report = await asyncio.gather(
+        asyncio.to_thread(run_research_task, task),
+        aanalyze_risks(task),
+        asyncio.to_thread(analyze_competition, task),
+    )
 
     research_data = json.loads(research_json)
     research_analysis = research_data.get("final_result", "")
 
-    # 2. Synthesize Strategy
-    prompt = f"""
-    You are a Chief Investment Officer (CIO) / Portfolio Manager.
-    Develop a Capital Allocation Strategy based on the following intelligence reports.
-
-    USER TASK: {task}
-
-    --- INTELLIGENCE REPORTS ---
-
+    return f"""
     [REPORT 1: FUNDAMENTAL RESEARCH]
     {research_analysis}
 
@@ -42,33 +86,109 @@ def model_capital_allocation(task: str) -> str:
 
     [REPORT 3: COMPETITIVE LANDSCAPE]
     {comp_report}
+    """
 
-    --- INSTRUCTIONS ---
 
-    Synthesize these inputs into a structured Capital Deployment Framework.
+def _cio_prompt(task: str, intelligence: str) -> str:
+    return f"""
+    You are a Chief Investment Officer (CIO) / Portfolio Manager.
+    Develop a Capital Allocation Strategy based on the following intelligence reports.
 
-    Output Format (Markdown):
+    USER TASK: {task}
 
-    # Capital Allocation Strategy: [Company/Topic]
+    --- INTELLIGENCE REPORTS ---
+    {intelligence}
+    --- INSTRUCTIONS ---
+    {CIO_INSTRUCTIONS}"""
 
-    ## 1. Capital Thesis
-    (The core argument for how capital should be deployed - e.g., heavy R&D, dividends, M&A)
 
-    ## 2. Scenario Modeling
-    *   **Base Case**: (Most likely outcome given current trends)
-    *   **Bull Case**: (Upside drivers - e.g., successful AI monetization, margin expansion)
-    *   **Bear Case**: (Downside realization - e.g., regulatory crackdown, comp losses)
+async def abuild_capital_allocation_prompt(task: str) -> str:
+    """
+    Run the Research, Risk, and Competitive agents in parallel and build
+    the CIO synthesis prompt from their reports.
+    """
+    intelligence = await agather_intelligence(task)
 
-    ## 3. Recommended Capital Posture
-    (e.g., "Overweight Investment in AI Infra", "Defensive Balance Sheet Management")
+    # 2. Synthesize Strategy
+    return _cio_prompt(task, intelligence)
 
-    ## 4. Key Sensitivities
-    (What variables move the needle most?)
 
-    ## 5. Diligence Questions
-    (What is still unknown?)
+async def amodel_capital_allocation_batch(companies: list[str], task: str,
+                                         max_parallel: int = 8) -> dict[str, str]:
+    """
+    Capital Allocation Strategies for several companies with one CIO call per
+    MARSHAL_BATCH_SIZE companies instead of one each: the per-company
+    intelligence is gathered in parallel, then marshaled into a single prompt
+    that returns one labeled report per company. Any company missing from
+    the response falls back to its own call.
+
+    max_parallel: companies gathering intelligence at once (each runs three
+    sub-agents concurrently).
+    """
+    sub_tasks = {c: f"Capital allocation analysis for {c}. Context: {task}" for c in companies}
+    limit = asyncio.Semaphore(max_parallel)
+
+    async def gather_one(company):
+        async with limit:
+            print(f"    -> Gathering intelligence for {company}...")
+            # Sub-tasks share the templated context, so only exact prompts may hit
+            with exact_cache_only():
+                return await agather_intelligence(sub_tasks[company])
+
+    intelligence = dict(zip(companies, await asyncio.gather(*(gather_one(c) for c in companies))))
+
+    async def synthesize(batch):
+        sections = "".join(
+            f"\n    ### COMPANY {i}: {c}\n    USER TASK: {sub_tasks[c]}\n{intelligence[c]}"
+            for i, c in enumerate(batch, 1)
+        )
+        prompt = f"""
+    You are a Chief Investment Officer (CIO) / Portfolio Manager.
+    Develop a separate Capital Allocation Strategy for EACH company below, based only
+    on that company's intelligence reports.
 
-    Cite the sources provided in the reports.
+    --- INTELLIGENCE REPORTS ---
+    {sections}
+    --- INSTRUCTIONS (apply to each company) ---
+    {CIO_INSTRUCTIONS}
+    Return one entry per company, using the company name exactly as given in its heading.
     """
+        response = await acall_gemini(prompt, response_schema=CompanyReports)
+        try:
+            parsed = CompanyReports.model_validate_json(response)
+        except ValidationError:
+            return {}
+        return {r.company: r.report for r in parsed.reports if r.company in sub_tasks}
+
+    batches = [companies[i:i + MARSHAL_BATCH_SIZE] for i in range(0, len(companies), MARSHAL_BATCH_SIZE)]
+    reports = {}
+    for batch_reports in await asyncio.gather(*(synthesize(b) for b in batches)):
+        reports.update(batch_reports)
+
+    missing = [c for c in companies if c not in reports]
+    if missing:
+        print(f"  [Capital Agent] Marshaled response missed {missing}; synthesizing individually")
+        fallback = await asyncio.gather(*(
+            acall_gemini(_cio_prompt(sub_tasks[c], intelligence[c]))
+            for c in missing
+        ))
+        reports.update(zip(missing, fallback))
+
+    return reports
+
+
+async def amodel_capital_allocation(task: str) -> str:
+    """
+    Synthesize a Capital Allocation Strategy by orchestrating
+    Research, Risk, and Competitive agents in parallel.
+    """
+    prompt = await abuild_capital_allocation_prompt(task)
+    return await acall_gemini(prompt, semantic_key=task, namespace="capital_allocation")
+
 
-    return call_gemini(prompt)
+def model_capital_allocation(task: str) -> str:
+    """
+    Synthesize a Capital Allocation Strategy by orchestrating
+    Research, Risk, and Competitive agents in parallel.
+    """
+    return asyncio.run(amodel_capital_allocation(task))
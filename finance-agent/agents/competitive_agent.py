@@ -1,8 +1,29 @@
-from core.financial_memory import load_facts, get_facts_for_companies, compact_facts
+from core.financial_memory import get_facts_context
 from core.entity_extraction import extract_companies
 from tools.retrieve import search_financials
+from pydantic import BaseModel, Field, ValidationError
 from vertex import call_gemini
-import json
+
+COMPETITIVE_SEARCH_QUERY = "{task} competitive strategy market share positioning vs peers"
+COMPETITIVE_SEARCH_K = 10
+# Structured facts kept in the prompt, ranked by relevance to the task
+FACTS_TOP_K = 200
+
+
+class ComparisonRow(BaseModel):
+    Company: str
+    Metric: str
+    Value: str
+    Year: str
+
+
+class CompetitiveAnalysis(BaseModel):
+    """Response schema; Gemini's JSON mode constrains the output to it."""
+    executive_summary: str = Field(description="High-level narrative comparison of the companies.")
+    comparison_table: list[ComparisonRow]
+    strategic_positioning: str = Field(description="Narrative comparison of strengths, weaknesses, and market position.")
+    risks: list[str] = Field(description="Key risks, one entry per company-specific risk.")
+
 
 def analyze_competition(task: str) -> str:
     """
@@ -10,16 +31,11 @@ def analyze_competition(task: str) -> str:
     """
     # 1. Get relevant facts (filtered by companies in query)
     companies = extract_companies(task)
-    if companies:
-        facts = get_facts_for_companies(companies)
-    else:
-        facts = load_facts()[:300]
-    facts = facts[:500]
-    facts_context = compact_facts(facts)
+    facts_context = get_facts_context(companies, fallback_limit=300, limit=FACTS_TOP_K, query=task)
 
     # 2. Vector Search for Strategic Context
-    search_query = f"{task} competitive strategy market share positioning vs peers"
-    search_results = search_financials(search_query, k=10)
+    search_query = COMPETITIVE_SEARCH_QUERY.format(task=task)
+    search_results = search_financials(search_query, k=COMPETITIVE_SEARCH_K)
 
     text_context = ""
     for res in search_results:
@@ -27,57 +43,40 @@ def analyze_competition(task: str) -> str:
         text_context += f"Source: {res.get('source', 'Unknown')}\nContent: {text}\n---\n"
 
     # 3. LLM Synthesis
-    prompt = f"""
+    # Static instructions first, retrieved data last: the metrics are ranked
+    # against the task, so only the preamble is the same on every call.
+    preamble = """
     You are a Competitive Intelligence Analyst.
     Perform a comparative analysis based on the user's task.
 
-    USER TASK: {task}
+    INSTRUCTIONS:
+    1. Identify the companies mentioned or implied in the task.
+    2. Compare them using the available data.
+       - If data for a company is missing in the "metrics" section, explicitly state: "Data for [Company] not available in local verified memory."
+    3. Cite sources (filenames) for all data points within the text.
+    """
 
+    prompt = f"""
     AVAILABLE STRUCTURED METRICS:
     {facts_context}
 
+    USER TASK: {task}
+
     QUALITATIVE CONTEXT (Search Results):
     {text_context}
-
-    INSTRUCTIONS:
-    1. Identify the companies mentioned or implied in the task.
-    2. Compare them using the available data.
-       - If data for a company is missing in the "metrics" section, explicitly state: "Data for [Company] not available in local verified memory."
-    3. Output Format:
-       Return a valid JSON object with the following schema:
-       {{
-         "executive_summary": "High-level narrative comparison of the companies.",
-         "comparison_table": [
-           {{"Company": "Company A", "Metric": "Revenue", "Value": "10B", "Year": "2024"}},
-           {{"Company": "Company B", "Metric": "Revenue", "Value": "12B", "Year": "2024"}}
-         ],
-         "strategic_positioning": "Narrative comparison of strengths, weaknesses, and market position.",
-         "risks": [
-           "Risk 1 for Company A",
-           "Risk 1 for Company B"
-         ]
-       }}
-    4. Cite sources (filenames) for all data points within the text.
-    5. Return ONLY valid JSON, no markdown formatting or extra text.
     """
 
-    response = call_gemini(prompt)
-    
-    # Parse JSON
+    response = call_gemini(
+        preamble + prompt,
+        semantic_key=task,
+        namespace="competitive",
+        response_schema=CompetitiveAnalysis,
+    )
+
     try:
-        # Remove markdown code fences if present
-        import re
-        content = response
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', content, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            json_match = re.search(r'\{.*?\}', content, re.DOTALL)
-            json_str = json_match.group(0) if json_match else content
-
-        return json.loads(json_str)
-    except Exception as e:
-        # Fallback to returning raw text in a wrapper
+        return CompetitiveAnalysis.model_validate_json(response).model_dump()
+    except ValidationError:
+        # Only reachable if the response was cut off mid-object
         return {
             "executive_summary": "Error parsing JSON response. Raw output below.",
             "comparison_table": [],
@@ -1,9 +1,13 @@
-from core.financial_memory import load_facts, get_facts_for_companies, compact_facts
+from core.financial_memory import get_facts_context
 from core.entity_extraction import extract_companies
 from tools.retrieve import search_financials
 from vertex import call_gemini
 import json
 
+FINANCIAL_SEARCH_K = 5
+# Structured facts kept in the prompt, ranked by relevance to the query
+FACTS_TOP_K = 200
+
 def analyze_financials(query: str) -> str:
     """
     Analyze financial data to answer a query.
@@ -11,24 +15,30 @@ def analyze_financials(query: str) -> str:
     """
     # 1. Retrieve Structured Facts (filtered by company)
     companies = extract_companies(query)
-    if companies:
-        facts = get_facts_for_companies(companies)
-    else:
-        facts = load_facts()[:200]
-    facts = facts[:500]
-    facts_context = compact_facts(facts)
+    facts_context = get_facts_context(companies, fallback_limit=200, limit=FACTS_TOP_K, query=query)
 
     # 2. Retrieve Unstructured Text
-    search_results = search_financials(query, k=5)
+    search_results = search_financials(query, k=FINANCIAL_SEARCH_K)
     text_context = ""
     for res in search_results:
         text = res.get('text', '')[:2000]
         text_context += f"Source: {res.get('source', 'Unknown')}\nContent: {text}\n---\n"
 
     # 3. Synthesize with LLM
-    prompt = f"""
+    # Static instructions first, retrieved data last: the facts are ranked
+    # against the query, so only the preamble is the same on every call.
+    preamble = """
     You are a senior financial analyst. Answer the user's query based on the provided data.
 
+    Instructions:
+    - Use the STRUCTURED FACTS for specific numbers (Revenue, Net Income, etc.) to ensure accuracy.
+    - Use the TEXT SEARCH RESULTS to explain trends, reasons, and provide qualitative context.
+    - Cite your sources (e.g., [Source: _10-K...]).
+    - If data is conflicting, prioritize the STRUCTURED FACTS for numbers.
+    - Provide a professional, comprehensive answer.
+    """
+
+    prompt = f"""
     Data Sources:
     1. STRUCTURED FACTS (High precision numbers):
     {facts_context}
@@ -37,13 +47,6 @@ def analyze_financials(query: str) -> str:
     {text_context}
 
     Query: {query}
-
-    Instructions:
-    - Use the STRUCTURED FACTS for specific numbers (Revenue, Net Income, etc.) to ensure accuracy.
-    - Use the TEXT SEARCH RESULTS to explain trends, reasons, and provide qualitative context.
-    - Cite your sources (e.g., [Source: _10-K...]).
-    - If data is conflicting, prioritize the STRUCTURED FACTS for numbers.
-    - Provide a professional, comprehensive answer.
     """
 
-    return call_gemini(prompt)
+    return call_gemini(preamble + prompt, semantic_key=query, namespace="financial")
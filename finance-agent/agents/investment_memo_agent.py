@@ -2,6 +2,29 @@ from control.control_plane import run_research_task
 from vertex import call_gemini
 import json
 
+
+def _format_verification_for_prompt(verification: dict) -> str:
+    """
+    Render the verification report as a Markdown table (claim / status /
+    evidence). Far fewer tokens than the JSON form, with no keys repeated
+    per row.
+    """
+    items = (verification or {}).get("items") or []
+    if not items:
+        return "No numerical claims were checked."
+
+    def cell(value) -> str:
+        return str(value or "-").replace("|", "/").replace("\n", " ")
+
+    rows = [
+        f"| {cell(item.get('claim'))} | {cell(item.get('status'))} | {cell(item.get('evidence'))} |"
+        for item in items
+    ]
+    score = verification.get("summary_score")
+    header = f"Summary score: {score:.2f}\n" if isinstance(score, (int, float)) else ""
+    return header + "| Claim | Status | Evidence |\n|---|---|---|\n" + "\n".join(rows)
+
+
 def generate_investment_memo(task: str) -> str:
     """
     Generate a professional investment research memo based on the task.
@@ -25,7 +48,7 @@ def generate_investment_memo(task: str) -> str:
     {analysis}
     
     VERIFICATION REPORT:
-    {json.dumps(verification)}
+    {_format_verification_for_prompt(verification)}
     
     INSTRUCTIONS:
     - Format as a clean Markdown document.
@@ -41,4 +64,4 @@ def generate_investment_memo(task: str) -> str:
     - Cite sources where possible.
     """
     
-    return call_gemini(prompt)
+    return call_gemini(prompt, semantic_key=task, namespace="investment_memo")
@@ -1,45 +1,71 @@
-from concurrent.futures import ThreadPoolExecutor
-from agents.capital_allocation_agent import model_capital_allocation
-from vertex import call_gemini
+import asyncio
+from agents.capital_allocation_agent import (
+    amodel_capital_allocation, amodel_capital_allocation_batch, abuild_capital_allocation_prompt,
+)
+from core.entity_extraction import extract_companies
+from vertex import acall_gemini, call_gemini_batch
 
-def analyze_portfolio(task: str) -> str:
+MAX_PARALLEL_COMPANIES = 8
+
+async def aanalyze_portfolio(task: str, batch_mode: bool = False, marshal_prompts: bool = False) -> str:
     """
     Synthesize a Portfolio Strategy by aggregating capital allocation models
     for multiple companies in parallel.
-    """
 
-    # 1. Identify Entities (Basic Heuristic for MVP)
-    known_companies = ["Apple", "Microsoft", "Google", "Alphabet", "Amazon", "Tesla", "Meta", "NVIDIA"]
-    targets = [c for c in known_companies if c.lower() in task.lower()]
+    batch_mode: send the per-company CIO syntheses as one Gemini batch job
+    (about half the cost, minutes of latency) for non-interactive runs.
+
+    marshal_prompts: pack the per-company CIO syntheses into one call per
+    few companies instead of one call each. Fewer requests against the rate
+    limit, but a single long generation instead of parallel short ones.
+    """
 
-    if "Google" in targets and "Alphabet" not in targets:
-        targets.append("Alphabet")
-    if "Alphabet" in targets and "Google" not in targets:
-        targets.append("Google")
-    targets = list(set(targets))
+    # 1. Identify Entities (aliases such as Google/Alphabet resolve to one canonical name)
+    targets = extract_companies(task)
 
     if not targets:
         return "No specific companies identified for portfolio analysis. Please name companies (e.g. Apple, Microsoft) in your query."
 
     print(f"  [Portfolio Agent] Identified Targets: {targets}")
 
-    # 2. Fan-Out: Run Capital Allocation Model for ALL companies IN PARALLEL
-    def run_one(company):
-        sub_task = f"Capital allocation analysis for {company}. Context: {task}"
-        print(f"    -> Modeling {company}...")
-        return company, model_capital_allocation(sub_task)
-
-    reports = {}
-    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
-        futures = [executor.submit(run_one, c) for c in targets]
-        for future in futures:
-            company, report = future.result()
-            reports[company] = report
-
-    # 3. Fan-In: Synthesize Portfolio View
+    # A one-company "portfolio" is just its capital allocation model; a second
+    # synthesis pass would restate the same report
+    if len(targets) == 1:
+        company = targets[0]
+        print(f"    -> Single target, returning the capital allocation model for {company}")
+        report = await amodel_capital_allocation(f"Capital allocation analysis for {company}. Context: {task}")
+        return f"# Portfolio Strategy: {company}\n\n{report}"
+
+    # 2. Fan-Out: Run Capital Allocation Model for ALL companies concurrently on one event loop.
+    if marshal_prompts and not batch_mode:
+        print(f"  [Portfolio Agent] Marshaling {len(targets)} syntheses into shared calls...")
+        reports = await amodel_capital_allocation_batch(targets, task, MAX_PARALLEL_COMPANIES)
+        return await _synthesize_portfolio(task, targets, reports)
+
+    # Each company runs 3 sub-agents in worker threads, so cap how many are in flight.
+    limit = asyncio.Semaphore(MAX_PARALLEL_COMPANIES)
+    worker = abuild_capital_allocation_prompt if batch_mode else amodel_capital_allocation
+
+    async def run_one(company):
+        async with limit:
+            print(f"    -> Modeling {company}...")
+            return await worker(f"Capital allocation analysis for {company}. Context: {task}")
+
+    results = await asyncio.gather(*(run_one(c) for c in targets))
+
+    if batch_mode:
+        # results currently hold the CIO synthesis prompts
+        print(f"  [Portfolio Agent] Submitting {len(targets)} syntheses as a batch job...")
+        results = await asyncio.to_thread(call_gemini_batch, list(results))
+    reports = dict(zip(targets, results))
+    return await _synthesize_portfolio(task, targets, reports)
+
+
+async def _synthesize_portfolio(task: str, targets: list[str], reports: dict[str, str]) -> str:
+    # 3. Fan-In: Synthesize Portfolio View (in target order, not completion order)
     reports_text = ""
-    for company, report in reports.items():
-        reports_text += f"\n--- REPORT: {company} ---\n{report}\n"
+    for company in targets:
+        reports_text += f"\n--- REPORT: {company} ---\n{reports[company]}\n"
 
     prompt = f"""
     You are a Lead Portfolio Manager.
@@ -80,4 +106,12 @@ def analyze_portfolio(task: str) -> str:
     Cite evidence from the component reports.
     """
 
-    return call_gemini(prompt)
+    return await acall_gemini(prompt, semantic_key=task, namespace="portfolio")
+
+
+def analyze_portfolio(task: str, batch_mode: bool = False, marshal_prompts: bool = False) -> str:
+    """
+    Synthesize a Portfolio Strategy by aggregating capital allocation models
+    for multiple companies in parallel.
+    """
+    return asyncio.run(aanalyze_portfolio(task, batch_mode=batch_mode, marshal_prompts=marshal_prompts))
@@ -1,75 +1,107 @@
-from core.financial_memory import load_facts, get_facts_for_companies
+from core.financial_memory import facts_version, get_fact_series
 from core.entity_extraction import extract_companies
 from tools.retrieve import search_financials
-from vertex import call_gemini
+from vertex import acall_gemini
+import asyncio
 import json
+import re
+from functools import lru_cache
+from itertools import groupby
+import numpy as np
+
+RISK_SEARCH_QUERY = "{task} risk factors challenges uncertainties competition regulation"
+RISK_SEARCH_K = 5
+
+_CURRENCY_CHARS_RE = re.compile(r"[$,%\s]")
 
 def parse_value(val_str: str) -> float:
     """Helper to parse currency strings to float."""
+    # Most stored values are already plain numbers
+    try:
+        return float(val_str)
+    except (TypeError, ValueError):
+        pass
     try:
-        clean = val_str.replace('$', '').replace(',', '').replace('%', '').strip()
-        return float(clean)
-    except ValueError:
+        return float(_CURRENCY_CHARS_RE.sub("", val_str))
+    except (TypeError, ValueError):
         return 0.0
 
 def detect_anomalies(facts: list[dict]) -> list[str]:
     """
     Analyze facts for significant changes or drops.
     Returns a list of text descriptions of anomalies.
+
+    `facts` must be ordered by company, metric and year, as returned by
+    get_fact_series, so each metric's history arrives as one sorted run.
     """
-    anomalies = []
+    # Flatten to one row per (series, year), so every consecutive-year
+    # comparison is a single vectorized pass
+    series, series_ids, years, values = [], [], [], []
+    for key, rows in groupby(facts, key=lambda f: (f.get("company", "Unknown"), f.get("metric", "Unknown"))):
+        # Later facts for the same year replace earlier ones
+        by_year = {}
+        for fact in rows:
+            year = str(fact.get("year")) if fact.get("year") is not None else "Unknown"
+            by_year[year] = fact.get("value", "0")
+        if len(by_year) < 2:
+            continue
+        for year, value in by_year.items():
+            series_ids.append(len(series))
+            years.append(year)
+            values.append(parse_value(value))
+        series.append(key)
 
-    # Group by metric and company
-    history = {}
+    if not series:
+        return []
 
-    for fact in facts:
-        key = (fact.get("company", "Unknown"), fact.get("metric", "Unknown"))
-        if key not in history:
-            history[key] = {}
-        year = str(fact.get("year")) if fact.get("year") is not None else "Unknown"
-        history[key][year] = fact.get("value", "0")
+    ids = np.asarray(series_ids)
+    v = np.asarray(values, dtype=np.float64)
+    v_prev, v_curr = v[:-1], v[1:]
 
     # Detect shifts
-    for (company, metric), years in history.items():
-        sorted_years = sorted(years.keys())
-        if len(sorted_years) < 2:
-            continue
+    comparable = (ids[:-1] == ids[1:]) & (v_prev != 0)
+    change_pct = np.zeros_like(v_prev)
+    np.divide(v_curr - v_prev, v_prev, out=change_pct, where=comparable)
+    change_pct *= 100
 
-        for i in range(len(sorted_years) - 1):
-            y_prev = sorted_years[i]
-            y_curr = sorted_years[i+1]
+    anomalies = []
+    for i in np.flatnonzero(comparable & ((change_pct < -5.0) | (change_pct > 20.0))).tolist():
+        company, metric = series[series_ids[i]]
+        pct, curr, prev = float(change_pct[i]), values[i + 1], values[i]
+        if pct < -5.0:
+            anomalies.append(f"NEGATIVE DRIFT: {company} {metric} declined {pct:.1f}% from {years[i]} to {years[i + 1]} (Value: {curr} vs {prev})")
+        else:
+            anomalies.append(f"SPIKE: {company} {metric} jumped {pct:.1f}% from {years[i]} to {years[i + 1]} (Value: {curr} vs {prev})")
 
-            v_prev = parse_value(years[y_prev])
-            v_curr = parse_value(years[y_curr])
+    return anomalies
 
-            if v_prev == 0: continue
+@lru_cache(maxsize=64)
+def _cached_anomalies(companies: tuple, version) -> tuple:
+    return tuple(detect_anomalies(get_fact_series(list(companies) or None)))
 
-            change_pct = ((v_curr - v_prev) / v_prev) * 100
 
-            if change_pct < -5.0:
-                anomalies.append(f"NEGATIVE DRIFT: {company} {metric} declined {change_pct:.1f}% from {y_prev} to {y_curr} (Value: {v_curr} vs {v_prev})")
-            elif change_pct > 20.0:
-                 anomalies.append(f"SPIKE: {company} {metric} jumped {change_pct:.1f}% from {y_prev} to {y_curr} (Value: {v_curr} vs {v_prev})")
+def anomalies_for_companies(companies: list[str]) -> list[str]:
+    """
+    Anomalies across the given companies' facts (all facts if empty),
+    computed once per version of the facts file rather than per query.
+    """
+    return list(_cached_anomalies(tuple(companies), facts_version()))
 
-    return anomalies
 
-def analyze_risks(task: str) -> str:
+async def aanalyze_risks(task: str) -> str:
     """
     Identify financial risks and anomalies.
     """
-    # 1. Structure Analysis (filtered by company)
+    # 1. Structure Analysis (filtered by company) and 2. Risk Search are
+    # independent, so load facts and search concurrently
     companies = extract_companies(task)
-    if companies:
-        facts = get_facts_for_companies(companies)
-    else:
-        facts = load_facts()
-    anomalies = detect_anomalies(facts)
+    search_query = RISK_SEARCH_QUERY.format(task=task)
+    anomalies, search_results = await asyncio.gather(
+        asyncio.to_thread(anomalies_for_companies, companies),
+        asyncio.to_thread(search_financials, search_query, k=RISK_SEARCH_K),
+    )
     anomaly_text = "\n".join(anomalies) if anomalies else "No significant numerical anomalies detected in stored facts."
 
-    # 2. Risk Search
-    search_query = f"{task} risk factors challenges uncertainties competition regulation"
-    search_results = search_financials(search_query, k=5)
-
     text_context = ""
     for res in search_results:
         text = res.get('text', '')[:2000]
@@ -97,4 +129,11 @@ def analyze_risks(task: str) -> str:
     Cite sources.
     """
 
-    return call_gemini(prompt)
+    return await acall_gemini(prompt, semantic_key=task, namespace="risk")
+
+
+def analyze_risks(task: str) -> str:
+    """
+    Identify financial risks and anomalies.
+    """
+    return asyncio.run(aanalyze_risks(task))
@@ -4,26 +4,44 @@ POST /analyze — Run the multi-agent disclosure analysis pipeline.
 Request body (structured — preferred):
   { "ticker": "BHARTI", "q_prev": "Q2_2026", "q_curr": "Q3_2026" }
 
+POST /analyze/stream takes the same body and reports progress as
+Server-Sent Events while the pipeline runs.
+
 The endpoint resolves the PDF paths from the all-pdfs directory,
 runs the full multi-agent pipeline, persists the result, and returns
 the DashboardPayload.
 """
 
-import json
+import asyncio
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from api.auth import get_current_user
 from db.supabase import supabase_admin
+from multiagent_analysis.pipeline import run_pipeline
 
 router = APIRouter(prefix="/analyze", tags=["analyze"])
 
 _PDF_DIR = Path(__file__).parent.parent / "multiagent_analysis" / "all-pdfs"
 
+_pdf_index: dict[str, Path] = {}  # lowercased file name -> path
+_pdf_index_mtime: Optional[float] = None  # mtime of _PDF_DIR when indexed
+
+# Per-user history snapshots for polling dashboards:
+# user_id -> (expires at, rows, etag)
+_HISTORY_TTL_SECONDS = 5
+_HISTORY_CACHE_MAX = 1000
+_history_cache: OrderedDict[str, tuple[float, list[dict], str]] = OrderedDict()
+
 
 # ── Request / Response models ─────────────────────────────────────────────────
 
@@ -41,20 +59,30 @@ class AnalyzeResponse(BaseModel):
 
 # ── PDF resolver ──────────────────────────────────────────────────────────────
 
+def _refresh_pdf_index() -> dict[str, Path]:
+    """Re-scan all-pdfs/ only when the directory has changed since the last scan."""
+    global _pdf_index, _pdf_index_mtime
+    mtime = os.stat(_PDF_DIR).st_mtime
+    if mtime != _pdf_index_mtime:
+        _pdf_index = {
+            p.name.lower(): p for p in _PDF_DIR.iterdir() if p.suffix.lower() == ".pdf"
+        }
+        _pdf_index_mtime = mtime
+    return _pdf_index
+
+
 def _resolve_pdf(ticker: str, quarter: str) -> Path:
     """
     Find PDF for ticker+quarter in all-pdfs/, case-insensitive.
     Raises HTTPException 422 if not found.
     """
-    target = f"{ticker}_{quarter}.pdf".lower()
-    for fname in os.listdir(_PDF_DIR):
-        if fname.lower() == target:
-            return _PDF_DIR / fname
-
-    available = sorted(
-        f for f in os.listdir(_PDF_DIR)
-        if f.upper().startswith(ticker.upper() + "_")
-    )
+    index = _refresh_pdf_index()
+    path = index.get(f"{ticker}_{quarter}.pdf".lower())
+    if path is not None:
+        return path
+
+    prefix = ticker.lower() + "_"
+    available = sorted(p.name for name, p in index.items() if name.startswith(prefix))
     hint = f" Available for {ticker}: {available}" if available else ""
     raise HTTPException(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -64,12 +92,8 @@ def _resolve_pdf(ticker: str, quarter: str) -> Path:
 
 # ── Endpoint ──────────────────────────────────────────────────────────────────
 
-@router.post("", response_model=AnalyzeResponse)
-async def analyze(
-    req: AnalyzeRequest,
-    user_id: Annotated[str, Depends(get_current_user)],
-):
-    """Run the multi-agent disclosure analysis pipeline."""
+def _resolve_request(req: AnalyzeRequest) -> tuple[str, Path, Path]:
+    """Validate the request and return (ticker, q_prev PDF, q_curr PDF)."""
     if not req.ticker or not req.q_prev or not req.q_curr:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -83,11 +107,36 @@ async def analyze(
         )
 
     ticker = req.ticker.upper()
-    q_prev_path = _resolve_pdf(ticker, req.q_prev)
-    q_curr_path = _resolve_pdf(ticker, req.q_curr)
+    return ticker, _resolve_pdf(ticker, req.q_prev), _resolve_pdf(ticker, req.q_curr)
+
+
+def _persist_result(user_id: str, ticker: str, req: AnalyzeRequest, payload: dict) -> str:
+    """Insert the payload into analysis_results and return the new row id."""
+    row = {
+        "user_id": user_id,
+        "company_ticker": ticker,
+        "q_prev": req.q_prev,
+        "q_curr": req.q_curr,
+        "payload": orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode(),
+    }
+    result = supabase_admin.table("analysis_results").insert(row).execute()
+    _history_cache.pop(user_id, None)
+    return result.data[0]["id"] if result.data else "unknown"
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+
+
+@router.post("", response_model=AnalyzeResponse)
+async def analyze(
+    req: AnalyzeRequest,
+    user_id: Annotated[str, Depends(get_current_user)],
+):
+    """Run the multi-agent disclosure analysis pipeline."""
+    ticker, q_prev_path, q_curr_path = _resolve_request(req)
 
     try:
-        from multiagent_analysis.pipeline import run_pipeline
         payload = await run_pipeline(str(q_prev_path), str(q_curr_path))
     except Exception as exc:
         raise HTTPException(
@@ -96,28 +145,101 @@ async def analyze(
         ) from exc
 
     # Persist to DB
-    row = {
-        "user_id": user_id,
-        "company_ticker": ticker,
-        "q_prev": req.q_prev,
-        "q_curr": req.q_curr,
-        "payload": json.dumps(payload),
-    }
-    result = supabase_admin.table("analysis_results").insert(row).execute()
-    record_id: str = result.data[0]["id"] if result.data else "unknown"
+    record_id = _persist_result(user_id, ticker, req, payload)
 
     return AnalyzeResponse(id=record_id, payload=payload)
 
 
+@router.post("/stream")
+async def analyze_stream(
+    req: AnalyzeRequest,
+    user_id: Annotated[str, Depends(get_current_user)],
+):
+    """
+    Run the pipeline and stream progress as Server-Sent Events: a `step`
+    event as each pipeline stage starts, then a `result` event with the
+    persisted id and payload (or an `error` event).
+    """
+    ticker, q_prev_path, q_curr_path = _resolve_request(req)
+
+    async def events():
+        steps: asyncio.Queue = asyncio.Queue()
+        pipeline = asyncio.create_task(
+            run_pipeline(str(q_prev_path), str(q_curr_path), on_step=steps.put_nowait)
+        )
+        pipeline.add_done_callback(lambda _: steps.put_nowait(None))
+
+        try:
+            while (step := await steps.get()) is not None:
+                yield _sse("step", {"step": step})
+
+            try:
+                payload = pipeline.result()
+            except Exception as exc:
+                yield _sse("error", {"detail": f"Pipeline error: {exc}"})
+                return
+
+            record_id = _persist_result(user_id, ticker, req, payload)
+            yield _sse("result", {"id": record_id, "payload": payload})
+        finally:
+            # Client went away mid-run: stop the pipeline rather than orphan it
+            pipeline.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def get_history_batch(user_ids: list[str], per_user: int = 20) -> dict[str, list[dict]]:
+    """
+    Most recent `per_user` analysis results for each of `user_ids`, newest
+    first, in one query (recent_analysis_results, migration 012) instead of
+    one round trip per user.
+    """
+    result = supabase_admin.rpc(
+        "recent_analysis_results", {"user_ids": user_ids, "per_user": per_user}
+    ).execute()
+
+    history: dict[str, list[dict]] = {uid: [] for uid in user_ids}
+    for row in result.data or []:
+        history.setdefault(row.pop("user_id"), []).append(row)
+    return history
+
+
+def _fetch_history(user_id: str) -> tuple[list[dict], str]:
+    """
+    The user's 20 most recent results and an ETag for them, served from a
+    short-lived per-user snapshot. The ETag hashes every returned row, since
+    RLS lets users update and delete their own results, not just insert.
+    """
+    now = time.monotonic()
+    cached = _history_cache.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1], cached[2]
+
+    rows = get_history_batch([user_id])[user_id]
+    digest = hashlib.blake2b(user_id.encode(), digest_size=16)
+    digest.update(orjson.dumps(rows, default=str, option=orjson.OPT_SORT_KEYS))
+    etag = f'"{digest.hexdigest()}"'
+
+    _history_cache[user_id] = (now + _HISTORY_TTL_SECONDS, rows, etag)
+    _history_cache.move_to_end(user_id)
+    if len(_history_cache) > _HISTORY_CACHE_MAX:
+        _history_cache.popitem(last=False)
+    return rows, etag
+
+
 @router.get("/history", response_model=list[dict])
-async def get_history(user_id: Annotated[str, Depends(get_current_user)]):
+async def get_history(
+    request: Request,
+    response: Response,
+    user_id: Annotated[str, Depends(get_current_user)],
+):
     """Fetch the 20 most recent analysis results for this user."""
-    result = (
-        supabase_admin.table("analysis_results")
-        .select("id, company_ticker, q_curr, payload, created_at")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .limit(20)
-        .execute()
-    )
-    return result.data or []
+    rows, etag = _fetch_history(user_id)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return rows
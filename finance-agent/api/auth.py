@@ -9,13 +9,17 @@ Usage:
         ...
 """
 
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from typing import Annotated
 
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError
 
 load_dotenv()
 
@@ -25,12 +29,30 @@ _AUDIENCE = "authenticated"
 
 _bearer = HTTPBearer(auto_error=True)
 
+# Verified tokens -> (user_id, cache expiry), so polling clients don't pay
+# for a signature check on every request. Entries live at most 60s and
+# never past the token's own exp.
+_TOKEN_CACHE_TTL_SECONDS = 60
+_TOKEN_CACHE_MAX = 10_000
+_token_cache: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 
 async def get_current_user(
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(_bearer)],
 ) -> str:
     """Decode the Bearer JWT issued by Supabase Auth and return user_id (sub)."""
     token = credentials.credentials
+    key = _token_key(token)
+    cached = _token_cache.get(key)
+    if cached is not None:
+        if cached[1] > time.time():
+            return cached[0]
+        del _token_cache[key]
+
     try:
         payload = jwt.decode(
             token,
@@ -44,8 +66,14 @@ async def get_current_user(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token: missing sub",
             )
+        expires_at = time.time() + _TOKEN_CACHE_TTL_SECONDS
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        _token_cache[key] = (user_id, expires_at)
+        if len(_token_cache) > _TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
         return user_id
-    except JWTError as exc:
+    except InvalidTokenError as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Could not validate credentials: {exc}",
@@ -7,12 +7,18 @@ then calls the Gmail API to send the message.
 
 import base64
 import email.mime.text
+import json
 import os
 from datetime import timezone
+from functools import lru_cache
 from typing import Annotated
 
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, status
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from pydantic import BaseModel, EmailStr
 
 from api.auth import get_current_user
@@ -39,11 +45,6 @@ async def send_email(
     user_id: Annotated[str, Depends(get_current_user)],
 ):
     """Send an email via the caller's connected Gmail account."""
-    # Lazy imports — heavy libs not needed at startup
-    from google.auth.transport.requests import Request  # type: ignore[import]
-    from google.oauth2.credentials import Credentials  # type: ignore[import]
-    from googleapiclient.discovery import build  # type: ignore[import]
-
     conn = _get_gmail_connection(user_id)
 
     creds = Credentials(
@@ -59,7 +60,7 @@ async def send_email(
         creds.refresh(Request())
         _update_stored_token(user_id, creds)
 
-    service = build("gmail", "v1", credentials=creds, cache_discovery=False)
+    service = build_from_document(_gmail_discovery_doc(), credentials=creds)
 
     message = email.mime.text.MIMEText(req.body, req.body_type)
     message["to"] = req.to
@@ -73,6 +74,15 @@ async def send_email(
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=1)
+def _gmail_discovery_doc() -> dict:
+    """
+    Gmail v1 discovery document, parsed once per process from the copy
+    bundled with google-api-python-client (no network fetch).
+    """
+    return json.loads(get_static_doc("gmail", "v1"))
+
+
 def _get_gmail_connection(user_id: str) -> dict:
     result = (
         supabase_admin.table("user_connections")
@@ -93,8 +103,6 @@ def _get_gmail_connection(user_id: str) -> dict:
 
 
 def _update_stored_token(user_id: str, creds) -> None:
-    from google.oauth2.credentials import Credentials  # type: ignore[import]
-
     expiry_iso = (
         creds.expiry.replace(tzinfo=timezone.utc).isoformat()
         if creds.expiry
@@ -16,20 +16,35 @@ Setup requirements:
 import hashlib
 import hmac
 import os
+import re
 import time
 from typing import Annotated
 
+import httpx
 from dotenv import load_dotenv
 from fastapi import APIRouter, Form, Header, HTTPException, Request, status
 
 from db.supabase import supabase_admin
+from vertex import acall_gemini
 
 load_dotenv()
 
 _SIGNING_SECRET = os.environ.get("SLACK_SIGNING_SECRET", "")
+_SIGNING_KEY = _SIGNING_SECRET.encode()
 
 router = APIRouter(prefix="/slack", tags=["slack"])
 
+# One pooled client for all response_url posts, so repeat commands reuse the
+# TLS connection to hooks.slack.com. Closed by the app's shutdown hook.
+_http = httpx.AsyncClient(
+    timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+
+
+async def aclose_http_client() -> None:
+    await _http.aclose()
+
 
 @router.post("/command")
 async def slack_command(
@@ -51,7 +66,7 @@ async def slack_command(
         signature=x_slack_signature,
     )
 
-    ticker = text.strip().upper() or "UNKNOWN"
+    ticker = _extract_ticker(text)
 
     # 2. Look up user by team_id
     conn = _get_connection_by_team(team_id)
@@ -60,25 +75,20 @@ async def slack_command(
     # 3. Run pipeline (synchronous — Slack gives us 3s for immediate response)
     query = f"Analyze {ticker} latest earnings"
     try:
-        from vertex import call_gemini  # type: ignore[import]
-        result = call_gemini(query)
+        result = await acall_gemini(query)
         result_text = str(result)[:3000]  # Slack block limit
     except Exception as exc:
         result_text = f"Pipeline error: {exc}"
 
     # 4. Post back to Slack channel via response_url (deferred response)
-    import httpx  # type: ignore[import]
-
-    async with httpx.AsyncClient() as client:
-        await client.post(
-            response_url,
-            json={
-                "response_type": "in_channel",
-                "text": f"*Earnings Analysis — {ticker}*\n\n{result_text}",
-            },
-            headers={"Authorization": f"Bearer {bot_token}"},
-            timeout=10,
-        )
+    await _http.post(
+        response_url,
+        json={
+            "response_type": "in_channel",
+            "text": f"*Earnings Analysis — {ticker}*\n\n{result_text}",
+        },
+        headers={"Authorization": f"Bearer {bot_token}"},
+    )
 
     # Immediate ack to Slack (must be <3s)
     return {"response_type": "ephemeral", "text": f"Fetching analysis for {ticker}..."}
@@ -86,6 +96,18 @@ async def slack_command(
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+# Ticker-like tokens: letters and digits, allowing inner &, . and -. Covers
+# one-letter (F, T), digit-led (3M) and punctuated (BRK.B, M&M, BAJAJ-AUTO)
+# symbols; the first one in the command text is taken
+_TICKER_RE = re.compile(r"[A-Za-z0-9](?:[A-Za-z0-9&.-]*[A-Za-z0-9])?")
+
+
+def _extract_ticker(text: str) -> str:
+    """First ticker-like token of the command text, uppercased."""
+    match = _TICKER_RE.search(text)
+    return match.group(0).upper() if match else "UNKNOWN"
+
+
 def _verify_slack_signature(body: bytes, timestamp: str, signature: str) -> None:
     """Raise 401 if the request is not from Slack."""
     if not _SIGNING_SECRET:
@@ -100,12 +122,13 @@ def _verify_slack_signature(body: bytes, timestamp: str, signature: str) -> None
     if abs(time.time() - ts) > 300:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Stale request")
 
-    base = f"v0:{timestamp}:{body.decode()}"
-    expected = "v0=" + hmac.new(
-        _SIGNING_SECRET.encode(), base.encode(), hashlib.sha256
-    ).hexdigest()  # hmac.new = hmac.HMAC constructor alias
+    # MAC the raw body bytes directly rather than decoding and re-encoding it
+    mac = hmac.new(_SIGNING_KEY, b"v0:" + timestamp.encode() + b":", hashlib.sha256)
+    mac.update(body)
+    expected = b"v0=" + mac.hexdigest().encode()
 
-    if not hmac.compare_digest(expected, signature):
+    # Compare as bytes: compare_digest rejects non-ASCII str input outright
+    if not hmac.compare_digest(expected, signature.encode()):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature")
 
 
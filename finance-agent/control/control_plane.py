@@ -1,12 +1,16 @@
 import json
 import uuid
+import hashlib
 import datetime
+import threading
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
 from agents.financial_agent import analyze_financials
-from core.financial_memory import load_facts, get_facts_for_companies
+from core.financial_memory import facts_version, load_facts, get_facts_for_companies
 from core.entity_extraction import extract_companies
-from control.research_replay import save_session
+from control.research_replay import save_session_json
 import re
 
 # --- Data Models ---
@@ -36,19 +40,84 @@ class ResearchSession(BaseModel):
 
 # --- Verification Agent ---
 
+def _normalize_value(s: str) -> str:
+    """Strip $, commas and percent signs so "$1,234%" compares as "1234"."""
+    return s.replace('$', '').replace(',', '').replace('%', '').strip()
+
+
+# Claim boundaries: ! ? newlines, and periods except decimal points, so
+# "grew 12.5%" stays one claim
+_SENTENCE_END_RE = re.compile(r"(?<!\d)\.|\.(?!\d)|[!?\n]")
+_DIGIT_RE = re.compile(r"\d")
+
+# Numeric runs in normalized text; a fact can only match a sentence that
+# contains its number as one of these tokens
+_NUM_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+@lru_cache(maxsize=32)
+def _fact_value_index(companies: tuple, version) -> tuple:
+    """
+    Per-fact columns for verification, built once per company set and
+    version of the facts file: (facts, normalized values, significant metric
+    words, lower-cased metrics, {number: [fact indices]}, [indices of facts
+    with no number]). Facts with an empty value can never match and are left
+    out of both index lists.
+    """
+    facts = get_facts_for_companies(list(companies)) if companies else load_facts()
+    values = [_normalize_value(str(fact.get("value", ""))) for fact in facts]
+    metrics = [fact.get("metric", "").lower() for fact in facts]
+    metric_words = [tuple(w for w in metric.split() if len(w) > 3) for metric in metrics]
+
+    by_number = defaultdict(list)
+    without_number = []
+    for i, value in enumerate(values):
+        match = _NUM_RE.search(value)
+        if match:
+            by_number[match.group(0)].append(i)
+        elif value:
+            without_number.append(i)
+    return facts, values, metric_words, metrics, dict(by_number), without_number
+
+
+# Reports per (text digest, companies, facts version): re-verifying the same
+# answer against an unchanged fact store returns the stored report
+_verify_cache = OrderedDict()
+_VERIFY_CACHE_MAX = 256
+_verify_cache_lock = threading.Lock()
+
+
 class VerificationAgent:
     def verify(self, text: str, companies: list[str] = None) -> VerificationReport:
-        if companies:
-            facts = get_facts_for_companies(companies)
-        else:
-            facts = load_facts()
+        companies = tuple(companies or ())
+        version = facts_version()
+        key = (hashlib.blake2b(text.encode(), digest_size=16).digest(), companies, version)
+        with _verify_cache_lock:
+            cached = _verify_cache.get(key)
+            if cached is not None:
+                _verify_cache.move_to_end(key)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+        report = self._verify(text, companies, version)
+        stored = report.model_copy(deep=True)
+        with _verify_cache_lock:
+            _verify_cache[key] = stored
+            if len(_verify_cache) > _VERIFY_CACHE_MAX:
+                _verify_cache.popitem(last=False)
+        return report
+
+    def _verify(self, text: str, companies: tuple, version) -> VerificationReport:
+        facts, values, metric_words, metrics, by_number, without_number = _fact_value_index(
+            companies, version
+        )
         items = []
         
         # Simple heuristic: extract numbers and check if they exist in facts
         # In a real system, we'd use an LLM or stricter NLI
         
         # 1. Extract potential claims (sentences with numbers)
-        sentences = [s.strip() for s in text.split('.') if any(c.isdigit() for c in s)]
+        sentences = [s.strip() for s in _SENTENCE_END_RE.split(text) if _DIGIT_RE.search(s)]
         
         verified_count = 0
         
@@ -56,37 +125,32 @@ class VerificationAgent:
             found_match = False
             # Clean sentence for partial matching
             sent_clean = sent.lower()
-            
-            for fact in facts:
-                # Check if fact value is in sentence
-                fact_val = str(fact.get("value", ""))
-                
-                # Normalize both: remove $, commas, percent
-                def normalize(s):
-                    return s.replace('$', '').replace(',', '').replace('%', '').strip()
-
-                fact_val_norm = normalize(fact_val)
-                sent_norm = normalize(sent_clean)
-                
-                # Only match if the number is significant (more than 1 digit) to avoid matching "2" in "2025" or similar noise
-                # But here we assume fact_val is a specific metric value
-                
+            sent_norm = _normalize_value(sent_clean)
+
+            # Only facts whose number appears in the sentence can match; check
+            # them in fact order so the first matching fact is still the evidence
+            candidates = set(without_number)
+            for num in _NUM_RE.findall(sent_norm):
+                candidates.update(by_number.get(num, ()))
+
+            for i in sorted(candidates):
                 # Check for substring match of the value
-                if fact_val_norm and fact_val_norm in sent_norm:
+                if values[i] in sent_norm:
+                    fact = facts[i]
                     # Context check: does company or metric appear?
-                    # Split metric into words and check if at least one significant word appears in sentence
-                    metric_words = [w.lower() for w in fact.get("metric", "").split() if len(w) > 3]
+                    # At least one significant metric word must appear in the sentence
+                    words = metric_words[i]
                     
                     context_match = False
-                    if not metric_words: # specific metric name might be short
-                         if fact.get("metric", "").lower() in sent_clean:
+                    if not words: # specific metric name might be short
+                         if metrics[i] in sent_clean:
                              context_match = True
                     else:
-                         if any(w in sent_clean for w in metric_words):
+                         if any(w in sent_clean for w in words):
                              context_match = True
 
                     if context_match:
-                         items.append(VerificationItem(
+                         items.append(VerificationItem.model_construct(
                              claim=sent,
                              status="Verified",
                              evidence=f"Matched fact: {fact['metric']} = {fact['value']} ({fact['source_file']})",
@@ -97,7 +161,7 @@ class VerificationAgent:
                          break
             
             if not found_match:
-                 items.append(VerificationItem(
+                 items.append(VerificationItem.model_construct(
                      claim=sent,
                      status="Unverified",
                      evidence="No exact structured fact match found.",
@@ -105,12 +169,17 @@ class VerificationAgent:
                  ))
                  
         score = verified_count / len(sentences) if sentences else 0.0
-        return VerificationReport(items=items, summary_score=score)
+        # Every field above is built here with the right type, so skip validation
+        return VerificationReport.model_construct(items=items, summary_score=score)
 
 # --- Control Plane ---
 
 class ControlPlane:
     def run_task(self, query: str) -> ResearchSession:
+        return self._run(query)[0]
+
+    def _run(self, query: str) -> tuple[ResearchSession, str]:
+        """Run the task; returns the session and its JSON (serialized once)."""
         session = ResearchSession(query=query)
         companies = extract_companies(query)
 
@@ -123,7 +192,7 @@ class ControlPlane:
             session.trace.append(TraceStep(action="Agent Analysis", output=result))
         except Exception as e:
             session.trace.append(TraceStep(action="Error", output=str(e)))
-            return session
+            return session, session.model_dump_json(indent=2)
 
         # 2. Verify (using filtered facts for speed)
         verifier = VerificationAgent()
@@ -131,10 +200,12 @@ class ControlPlane:
         session.verification_report = report
         session.trace.append(TraceStep(action="Verification", output=report.model_dump()))
         
-        # Save session for replay
-        save_session(session.model_dump())
-        
-        return session
+        # Save session for replay, reusing the serialized form for the caller
+        raw = session.__pydantic_serializer__.to_json(session, indent=2)
+        timestamp = session.trace[0].timestamp if session.trace else "Unknown"
+        save_session_json(session.session_id, raw, session.query, timestamp)
+
+        return session, raw.decode()
 
 # --- Singleton / Tool Entrypoint ---
 
@@ -145,5 +216,5 @@ def run_research_task(query: str) -> str:
     Run a full financial research task with verification and tracing.
     Returns a JSON string of the session.
     """
-    session = control_plane.run_task(query)
-    return session.model_dump_json(indent=2)
+    _, session_json = control_plane._run(query)
+    return session_json
@@ -1,12 +1,20 @@
 import json
 import os
 import glob
+import orjson
 from typing import List, Dict, Optional, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from datetime import datetime
 
 # Define paths
 SESSION_DIR = "data/sessions"
+# Append-only {id, query, timestamp} line per saved session, so listing
+# doesn't open and parse every session file
+SESSION_INDEX = os.path.join(SESSION_DIR, "index.jsonl")
+
+# TypeAdapter(ResearchSession), built on first use: control_plane imports
+# this module, so ResearchSession can't be imported at load time
+_SESSION_TA = None
 
 class ReplayResult(BaseModel):
     original_session_id: str
@@ -18,51 +26,108 @@ class ReplayResult(BaseModel):
 def ensure_session_dir():
     os.makedirs(SESSION_DIR, exist_ok=True)
 
+def _session_summary(session_data: Dict[str, Any]) -> Dict[str, Any]:
+    trace = session_data.get("trace") or [{}]
+    return {
+        "id": session_data.get("session_id"),
+        "query": session_data.get("query"),
+        "timestamp": trace[0].get("timestamp", "Unknown"),
+    }
+
+def _append_to_index(summary: Dict[str, Any]):
+    with open(SESSION_INDEX, "ab") as f:
+        f.write(orjson.dumps(summary) + b"\n")
+
 def save_session(session_data: Dict[str, Any]):
     """Save a research session to disk."""
-    ensure_session_dir()
     session_id = session_data.get("session_id")
     if not session_id:
         return
-        
+    summary = _session_summary(session_data)
+    save_session_json(session_id, orjson.dumps(session_data, option=orjson.OPT_INDENT_2),
+                      summary["query"], summary["timestamp"])
+
+def save_session_json(session_id: str, raw: bytes, query: str, timestamp: str):
+    """Save an already-serialized research session to disk and index it."""
+    ensure_session_dir()
+    if not os.path.exists(SESSION_INDEX):
+        _rebuild_index()
     path = os.path.join(SESSION_DIR, f"{session_id}.json")
-    with open(path, "w") as f:
-        json.dump(session_data, f, indent=2)
+    with open(path, "wb") as f:
+        f.write(raw)
+    _append_to_index({"id": session_id, "query": query, "timestamp": timestamp})
 
 def load_session(session_id: str) -> Optional[Dict[str, Any]]:
     """Load a session by ID."""
     path = os.path.join(SESSION_DIR, f"{session_id}.json")
     if not os.path.exists(path):
         return None
-    with open(path, "r") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
 
-def list_research_sessions() -> str:
-    """List available research sessions."""
-    ensure_session_dir()
-    files = glob.glob(os.path.join(SESSION_DIR, "*.json"))
-    sessions = []
-    
-    for f in files:
+def load_session_typed(session_id: str):
+    """
+    Load a session by ID as a ResearchSession, parsed and validated in one
+    pass from the file bytes. None if it doesn't exist or is a legacy file
+    that doesn't validate; load_session still returns those as dicts.
+    """
+    global _SESSION_TA
+    if _SESSION_TA is None:
+        from control.control_plane import ResearchSession
+        _SESSION_TA = TypeAdapter(ResearchSession)
+
+    path = os.path.join(SESSION_DIR, f"{session_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        return _SESSION_TA.validate_json(raw)
+    except ValidationError:
+        return None
+
+def _rebuild_index():
+    """Index session files saved before the index existed (one full scan)."""
+    summaries = []
+    for f in glob.glob(os.path.join(SESSION_DIR, "*.json")):
         try:
-            with open(f, "r") as r:
-                data = json.load(r)
-                sessions.append({
-                    "id": data.get("session_id"),
-                    "query": data.get("query"),
-                    "timestamp": data.get("trace", [{}])[0].get("timestamp", "Unknown")
-                })
+            with open(f, "rb") as r:
+                summaries.append(_session_summary(orjson.loads(r.read())))
         except:
             continue
-            
-    return json.dumps(sessions, indent=2)
+    with open(SESSION_INDEX, "wb") as f:
+        f.writelines(orjson.dumps(summary) + b"\n" for summary in summaries)
 
-def replay_research(session_id: str) -> str:
+def list_research_sessions() -> str:
+    """List available research sessions."""
+    ensure_session_dir()
+    if not os.path.exists(SESSION_INDEX):
+        _rebuild_index()
+
+    # A re-saved session appears once, with its latest summary
+    sessions = {}
+    with open(SESSION_INDEX, "rb") as f:
+        for line in f:
+            try:
+                summary = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue  # partial line from an interrupted write
+            sessions[summary.get("id")] = summary
+
+    return json.dumps(list(sessions.values()), indent=2)
+
+def replay_research(session_id: str, mode: str = "live") -> str:
     """
     Replay a past research session.
+
+    mode="live" re-runs the query through the control plane (new LLM call,
+    new saved session). mode="offline" keeps the original answer and only
+    re-verifies it against the current fact store, for cheap regression
+    checks after re-ingestion.
     """
     # Import here to avoid circular dependency
-    from control.control_plane import run_research_task
+    from control.control_plane import VerificationAgent, run_research_task
+    from core.entity_extraction import extract_companies
     
     # 1. Load Original
     original = load_session(session_id)
@@ -70,12 +135,20 @@ def replay_research(session_id: str) -> str:
         return json.dumps({"error": "Session not found"})
         
     query = original.get("query")
-    print(f"Replaying Query: {query}")
+    print(f"Replaying Query: {query} ({mode})")
     
     # 2. Run New
-    # This calls the control plane which generates a NEW session ID and saves it
-    new_json_str = run_research_task(query)
-    new_session = json.loads(new_json_str)
+    if mode == "offline":
+        # Same answer, fresh verification; nothing is saved
+        new_session = dict(original)
+        report = VerificationAgent().verify(
+            original.get("final_result") or "", companies=extract_companies(query or "")
+        )
+        new_session["verification_report"] = report.model_dump()
+    else:
+        # This calls the control plane which generates a NEW session ID and saves it
+        new_json_str = run_research_task(query)
+        new_session = json.loads(new_json_str)
     
     # 3. Compare (Basic Diff)
     original_trace = original.get("trace", [])
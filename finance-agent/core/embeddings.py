@@ -1,4 +1,11 @@
+import hashlib
 import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from google import genai
 from dotenv import load_dotenv
 
@@ -6,39 +13,134 @@ load_dotenv()
 
 client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
 
-# Cache for embedding results (text string -> embedding vector)
-_embed_cache = {}
+EMBED_MODEL = "models/gemini-embedding-001"
+EMBED_CACHE_PATH = "data/processed/embed_cache.db"
+EMBED_BATCH_SIZE = 100  # texts per API request (the API maximum)
+EMBED_MAX_PARALLEL = 8  # concurrent requests when embedding many batches
+
+# Hot in-memory tier (content hash -> float32 vector), bounded LRU
+_EMBED_CACHE_MAX = 4096
+_embed_cache = OrderedDict()
+_embed_cache_lock = threading.Lock()
+
+# Disk tier so re-ingestion and restarts don't re-embed identical text
+_disk = None
+_disk_lock = threading.Lock()
+_SQLITE_MAX_PARAMS = 900
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(f"{EMBED_MODEL}\0{text}".encode(), digest_size=16).digest()
+
+
+def _get_disk():
+    global _disk
+    if _disk is None:
+        os.makedirs(os.path.dirname(EMBED_CACHE_PATH), exist_ok=True)
+        _disk = sqlite3.connect(EMBED_CACHE_PATH, check_same_thread=False)
+        _disk.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB NOT NULL) WITHOUT ROWID"
+        )
+        _disk.commit()
+    return _disk
+
+
+def _remember(key: bytes, vector):
+    with _embed_cache_lock:
+        _embed_cache[key] = vector
+        _embed_cache.move_to_end(key)
+        if len(_embed_cache) > _EMBED_CACHE_MAX:
+            _embed_cache.popitem(last=False)
+
+
+def _disk_get_many(keys: list[bytes]) -> dict:
+    found = {}
+    with _disk_lock:
+        conn = _get_disk()
+        for j in range(0, len(keys), _SQLITE_MAX_PARAMS):
+            batch = keys[j:j + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in conn.execute(
+                f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", batch
+            ):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+    return found
+
+
+def _disk_put_many(rows: list[tuple[bytes, np.ndarray]]):
+    with _disk_lock:
+        conn = _get_disk()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+            [(key, vector.tobytes()) for key, vector in rows]
+        )
+        conn.commit()
+
+
+def _embed_batch(batch: list[str]) -> list[np.ndarray]:
+    res = client.models.embed_content(
+        model=EMBED_MODEL,
+        contents=batch
+    )
+    return [np.asarray(e.values, dtype=np.float32) for e in res.embeddings]
 
 
 def embed(texts):
+    """
+    Embed one text or a list of texts; returns a list of float32 vectors in
+    input order. Looks in the in-memory LRU, then the on-disk store, and
+    only sends the remaining texts to the API.
+    """
     if isinstance(texts, str):
         texts = [texts]
 
+    keys = [_text_key(text) for text in texts]
     all_embeddings = [None] * len(texts)
-    uncached_texts = []
-    uncached_indices = []
+    missing = {}  # key -> indices still needing a vector
+
+    with _embed_cache_lock:
+        for i, key in enumerate(keys):
+            vector = _embed_cache.get(key)
+            if vector is not None:
+                _embed_cache.move_to_end(key)
+                all_embeddings[i] = vector
+            else:
+                missing.setdefault(key, []).append(i)
 
-    for i, text in enumerate(texts):
-        if text in _embed_cache:
-            all_embeddings[i] = _embed_cache[text]
+    if missing:
+        try:
+            on_disk = _disk_get_many(list(missing))
+        except (sqlite3.Error, OSError) as e:
+            print(f"Embedding disk cache unavailable: {e}")
+            on_disk = {}
+        for key, vector in on_disk.items():
+            _remember(key, vector)
+            for i in missing.pop(key):
+                all_embeddings[i] = vector
+
+    # Batch-embed only uncached texts (each distinct text once)
+    if missing:
+        uncached_keys = list(missing)
+        uncached_texts = [texts[missing[key][0]] for key in uncached_keys]
+        batches = [
+            uncached_texts[j : j + EMBED_BATCH_SIZE]
+            for j in range(0, len(uncached_texts), EMBED_BATCH_SIZE)
+        ]
+        if len(batches) == 1:
+            results = [_embed_batch(batches[0])]
         else:
-            uncached_texts.append(text)
-            uncached_indices.append(i)
-
-    # Batch-embed only uncached texts
-    if uncached_texts:
-        batch_size = 100
-        new_embeddings = []
-        for j in range(0, len(uncached_texts), batch_size):
-            batch = uncached_texts[j : j + batch_size]
-            res = client.models.embed_content(
-                model="models/gemini-embedding-001",
-                contents=batch
-            )
-            new_embeddings.extend([e.values for e in res.embeddings])
-
-        for idx, emb_idx in enumerate(uncached_indices):
-            all_embeddings[emb_idx] = new_embeddings[idx]
-            _embed_cache[uncached_texts[idx]] = new_embeddings[idx]
+            # Requests are network-bound; map() keeps results in batch order
+            with ThreadPoolExecutor(max_workers=min(EMBED_MAX_PARALLEL, len(batches))) as pool:
+                results = list(pool.map(_embed_batch, batches))
+        new_embeddings = [vector for batch in results for vector in batch]
+
+        for key, vector in zip(uncached_keys, new_embeddings):
+            _remember(key, vector)
+            for i in missing[key]:
+                all_embeddings[i] = vector
+        try:
+            _disk_put_many(list(zip(uncached_keys, new_embeddings)))
+        except (sqlite3.Error, OSError) as e:
+            print(f"Embedding disk cache write failed: {e}")
 
     return all_embeddings
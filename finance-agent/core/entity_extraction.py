@@ -1,4 +1,5 @@
 """Extract company names from user queries using keyword matching."""
+import re
 
 # Canonical company names and their query-matching aliases
 QUERY_PATTERNS = {
@@ -13,14 +14,23 @@ QUERY_PATTERNS = {
 }
 
 
+# Single pass over the query: one alternation of every alias, longest first so
+# "prime video" wins over shorter overlaps, anchored on word boundaries so
+# "ios" no longer matches inside "scenarios" or "meta" inside "metadata"
+_ALIAS_TO_COMPANY = {
+    alias: canonical
+    for canonical, aliases in QUERY_PATTERNS.items()
+    for alias in aliases
+}
+_ALIAS_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(a) for a in sorted(_ALIAS_TO_COMPANY, key=len, reverse=True)) + r")\b"
+)
+
+
 def extract_companies(query: str) -> list[str]:
     """
     Extract canonical company names mentioned in a query.
     Returns list of canonical names, e.g. ["Apple", "Microsoft"].
     """
-    query_lower = query.lower()
-    found = []
-    for canonical, aliases in QUERY_PATTERNS.items():
-        if any(alias in query_lower for alias in aliases):
-            found.append(canonical)
-    return found
+    matched = {_ALIAS_TO_COMPANY[m] for m in _ALIAS_RE.findall(query.lower())}
+    return [canonical for canonical in QUERY_PATTERNS if canonical in matched]
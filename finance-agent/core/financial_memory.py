@@ -1,12 +1,21 @@
-import json
+import heapq
 import os
+import re
+import orjson
 from collections import defaultdict
+from functools import lru_cache
 
-MEMORY_PATH = "data/processed/financial_facts.json"
+# One JSON fact per line, so saving new facts is an append
+MEMORY_PATH = "data/processed/financial_facts.jsonl"
+# Previous single-array format, converted on first load if still present
+LEGACY_MEMORY_PATH = "data/processed/financial_facts.json"
 
 # Module-level caches
 _cached_facts = None
+_cached_mtime = None  # mtime of MEMORY_PATH when _cached_facts was loaded
 _company_index = None  # dict mapping canonical company -> [fact indices]
+_series_index = None  # same, but each list ordered by (company, metric, year)
+_series_order = None  # all fact indices ordered by (company, metric, year)
 
 # Mapping of known company name variants to canonical names
 # Built from actual data: MSFT(18759), Microsoft(12876), Alphabet Inc.(10368), etc.
@@ -64,8 +73,13 @@ COMPANY_ALIASES = {
 }
 
 
+@lru_cache(maxsize=4096)
 def _normalize_company(name: str) -> str:
-    """Normalize company name to canonical form."""
+    """
+    Normalize company name to canonical form. Memoized: the store repeats a
+    handful of raw names tens of thousands of times, so index builds become
+    one cache hit per fact.
+    """
     return COMPANY_ALIASES.get(name.lower().strip(), name)
 
 
@@ -78,20 +92,60 @@ def _build_company_index(facts):
     return dict(idx)
 
 
+def _migrate_legacy_store():
+    """Rewrite the old single-array JSON store as JSONL (once)."""
+    if os.path.exists(MEMORY_PATH) or not os.path.exists(LEGACY_MEMORY_PATH):
+        return
+    with open(LEGACY_MEMORY_PATH, "rb") as f:
+        facts = orjson.loads(f.read())
+    _write_lines(MEMORY_PATH, facts, "wb")
+
+
+def _write_lines(path: str, facts: list[dict], mode: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as f:
+        f.writelines(orjson.dumps(fact) + b"\n" for fact in facts)
+
+
+def _read_lines(path: str) -> list[dict]:
+    facts = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                facts.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue  # torn line from an interrupted append
+    return facts
+
+
 def load_facts() -> list[dict]:
-    """Load all stored financial facts. Cached after first call."""
-    global _cached_facts, _company_index
-    if _cached_facts is not None:
-        return _cached_facts
-    if not os.path.exists(MEMORY_PATH):
-        return []
+    """Load all stored financial facts. Cached until the backing file changes."""
+    global _cached_facts, _cached_mtime, _company_index, _series_index, _series_order
     try:
-        with open(MEMORY_PATH, "r") as f:
-            _cached_facts = json.load(f)
-        _company_index = _build_company_index(_cached_facts)
-        return _cached_facts
-    except json.JSONDecodeError:
+        _migrate_legacy_store()
+        mtime = os.path.getmtime(MEMORY_PATH)
+    except (OSError, orjson.JSONDecodeError):
         return []
+    if _cached_facts is not None and mtime == _cached_mtime:
+        return _cached_facts
+    _cached_facts = _read_lines(MEMORY_PATH)
+    _cached_mtime = mtime
+    _company_index = _build_company_index(_cached_facts)
+    _series_index = _series_order = None
+    _compact_facts_context.cache_clear()
+    return _cached_facts
+
+
+def facts_version():
+    """
+    Token that changes whenever the stored facts do (file mtime and fact
+    count, since an append can land within the mtime's resolution), for
+    callers that cache results derived from the facts.
+    """
+    facts = load_facts()
+    return (_cached_mtime, len(facts))
 
 
 def get_facts_for_companies(company_names: list[str]) -> list[dict]:
@@ -100,21 +154,54 @@ def get_facts_for_companies(company_names: list[str]) -> list[dict]:
     if _company_index is None:
         return facts
 
-    result_indices = set()
-    for name in company_names:
-        canonical = _normalize_company(name)
-        if canonical in _company_index:
-            result_indices.update(_company_index[canonical])
-        # Also try the raw name in case it's already canonical
-        if name in _company_index:
-            result_indices.update(_company_index[name])
+    # Aliases collapse to one canonical key, and each key's index list is
+    # already ascending, so a k-way merge keeps file order without set/sort
+    canonical = dict.fromkeys(_normalize_company(name) for name in company_names)
+    index_lists = [_company_index[c] for c in canonical if c in _company_index]
+    if len(index_lists) == 1:
+        return [facts[i] for i in index_lists[0]]
+    return [facts[i] for i in heapq.merge(*index_lists)]
+
+
+def _series_key(fact: dict) -> tuple:
+    year = fact.get("year")
+    return (
+        str(fact.get("company", "Unknown")),
+        str(fact.get("metric", "Unknown")),
+        str(year) if year is not None else "Unknown",
+    )
+
+
+def get_fact_series(company_names: list[str] = None) -> list[dict]:
+    """
+    Facts for the given companies (all facts if None) ordered by company,
+    metric and year, so each metric's history is one contiguous, year-sorted
+    run. Duplicate years keep file order. The orderings are computed once
+    per load of the facts file.
+    """
+    global _series_index, _series_order
+    facts = load_facts()
+    if _company_index is None:
+        return sorted(facts, key=_series_key)
+
+    def by_series(i):
+        return _series_key(facts[i])
+
+    if company_names is None:
+        if _series_order is None:
+            _series_order = sorted(range(len(facts)), key=by_series)
+        return [facts[i] for i in _series_order]
 
-    return [facts[i] for i in sorted(result_indices)]
+    if _series_index is None:
+        _series_index = {c: sorted(idx, key=by_series) for c, idx in _company_index.items()}
+    canonical = dict.fromkeys(_normalize_company(name) for name in company_names)
+    index_lists = [_series_index[c] for c in canonical if c in _series_index]
+    return [facts[i] for i in heapq.merge(*index_lists, key=by_series)]
 
 
 def compact_facts(facts: list[dict]) -> str:
     """Serialize facts in a compact format for LLM prompts.
-    Strips evidence/source_file fields and uses no indentation."""
+    Strips evidence/source_file fields and uses no indentation or spaces."""
     compact = [
         {"company": f.get("company", ""),
          "year": f.get("year", ""),
@@ -122,26 +209,104 @@ def compact_facts(facts: list[dict]) -> str:
          "value": f.get("value", "")}
         for f in facts
     ]
-    return json.dumps(compact)
+    return orjson.dumps(compact).decode()
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+# Words that say nothing about which metric a query wants
+_QUERY_STOPWORDS = {
+    "the", "and", "for", "with", "what", "how", "was", "were", "are", "its", "their",
+    "from", "over", "vs", "compare", "analysis", "analyze", "company", "companies",
+}
+
+
+@lru_cache(maxsize=4096)
+def _metric_words(metric: str) -> frozenset:
+    return frozenset(_WORD_RE.findall(metric.lower()))
+
+
+def rank_facts(facts: list[dict], query: str, limit: int) -> list[dict]:
+    """
+    Keep the `limit` facts most relevant to `query`: one point per query word
+    found in the fact's metric name, two for a year the query mentions. Ties
+    (including the no-signal case) keep file order, so this degrades to the
+    plain head slice.
+    """
+    if len(facts) <= limit:
+        return facts
+
+    query_lower = query.lower()
+    words = {
+        w for w in _WORD_RE.findall(query_lower)
+        if len(w) > 2 and w not in _QUERY_STOPWORDS and not w.isdigit()
+    }
+    years = set(_YEAR_RE.findall(query_lower))
+    if not words and not years:
+        return facts[:limit]
+
+    def score(i):
+        fact = facts[i]
+        s = len(words & _metric_words(str(fact.get("metric", ""))))
+        if years and str(fact.get("year", ""))[:4] in years:
+            s += 2
+        return s
+
+    top = heapq.nlargest(limit, range(len(facts)), key=lambda i: (score(i), -i))
+    return [facts[i] for i in sorted(top)]
+
+
+@lru_cache(maxsize=32)
+def _compact_facts_context(companies: tuple, fallback_limit: int, limit: int, query: str) -> str:
+    if companies:
+        facts = get_facts_for_companies(list(companies))
+    else:
+        facts = load_facts()[:fallback_limit]
+    if query:
+        facts = rank_facts(facts, query, limit)
+    return compact_facts(facts[:limit])
+
+
+def get_facts_context(companies: list[str], fallback_limit: int, limit: int = 500,
+                      query: str = None) -> str:
+    """
+    compact_facts() of the facts for `companies` (or the first `fallback_limit`
+    facts when none were identified), capped at `limit`. With `query`, the cap
+    keeps the facts most relevant to it (see rank_facts) rather than the first
+    ones. The serialized string is cached and rebuilt only when the facts file
+    changes.
+    """
+    load_facts()  # reloads (and clears the cache) if the file changed
+    return _compact_facts_context(tuple(companies), fallback_limit, limit, query)
 
 
 def save_facts(facts: list[dict]):
     """Save a list of facts to the store. Appends to existing facts."""
-    global _cached_facts, _company_index
-    existing = load_facts()
-    existing.extend(facts)
+    global _cached_mtime, _series_index, _series_order
+    existing = load_facts()  # bring the cache up to date before appending
+    cache_current = _cached_facts is not None and _cached_facts is existing
 
-    os.makedirs(os.path.dirname(MEMORY_PATH), exist_ok=True)
-    with open(MEMORY_PATH, "w") as f:
-        json.dump(existing, f, indent=2)
-    _cached_facts = None
-    _company_index = None
+    _write_lines(MEMORY_PATH, facts, "ab")
+
+    if cache_current:
+        # Extend the in-memory store and company index in place instead of
+        # re-reading the whole file on the next load
+        start = len(_cached_facts)
+        _cached_facts.extend(facts)
+        for i, fact in enumerate(facts, start):
+            canonical = _normalize_company(fact.get("company", "Unknown"))
+            _company_index.setdefault(canonical, []).append(i)
+        _cached_mtime = os.path.getmtime(MEMORY_PATH)
+        _series_index = _series_order = None
+    _compact_facts_context.cache_clear()
 
 
 def clear_memory():
     """Clear the memory store (useful for testing/re-ingestion)."""
-    global _cached_facts, _company_index
-    if os.path.exists(MEMORY_PATH):
-        os.remove(MEMORY_PATH)
+    global _cached_facts, _company_index, _series_index, _series_order
+    for path in (MEMORY_PATH, LEGACY_MEMORY_PATH):
+        if os.path.exists(path):
+            os.remove(path)
     _cached_facts = None
-    _company_index = None
+    _company_index = _series_index = _series_order = None
+    _compact_facts_context.cache_clear()
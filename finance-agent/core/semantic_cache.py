@@ -0,0 +1,116 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+from core.embeddings import embed
+from core.entity_extraction import extract_companies
+from core.financial_memory import facts_version
+from core.vector import INDEX_PATH
+
+# Cosine similarity above which two keys count as the same question.
+# Gemini embeddings score paraphrases well above 0.9, and unrelated finance
+# questions often land in the high 0.8s, so this is stricter than the ~0.87
+# commonly used with small sentence-transformer models.
+SIMILARITY_THRESHOLD = 0.95
+MAX_ENTRIES_PER_NAMESPACE = 1000
+
+# Years, amounts and percentages: "2023 revenue" and "2024 revenue" embed
+# almost identically but are different questions
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*%?")
+
+
+class _Namespace:
+    """Normalized key embeddings (inner product = cosine) + responses in LRU order."""
+
+    def __init__(self, dim):
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+        self.entries = OrderedDict()  # faiss id -> response
+        self.next_id = 0
+
+
+_namespaces = {}
+_data_seen = None  # data version the current namespaces were answered from
+_lock = threading.Lock()
+
+
+def _normalize(vector):
+    # Copy: normalize_L2 works in place and embed() returns shared cached vectors
+    v = np.array(vector, dtype="float32").reshape(1, -1)
+    faiss.normalize_L2(v)
+    return v
+
+
+def _data_version():
+    """Changes whenever new facts or documents are ingested."""
+    try:
+        index_mtime = os.path.getmtime(INDEX_PATH)
+    except OSError:
+        index_mtime = None
+    return facts_version(), index_mtime
+
+
+def lookup(namespace: str, key: str):
+    """
+    Return (response, slot) where response is the cached answer for the most
+    similar key in `namespace` (or None). Pass the slot back to `store` on a
+    miss so the key is only embedded once.
+
+    Keys are additionally scoped by the companies they mention: "Apple revenue
+    trend" and "Microsoft revenue trend" embed almost identically but must
+    never share an answer. The same goes for the years and numbers in the
+    key, and answers from before the last ingest are never served.
+    """
+    scope = (
+        namespace,
+        tuple(sorted(extract_companies(key))),
+        tuple(sorted(set(_NUMBER_RE.findall(key)))),
+        _data_version(),
+    )
+    vector = _normalize(embed(key)[0])
+    slot = (scope, vector)
+
+    global _data_seen
+    with _lock:
+        if scope[-1] != _data_seen:
+            # Everything cached so far predates the ingest
+            _namespaces.clear()
+            _data_seen = scope[-1]
+        ns = _namespaces.get(scope)
+        if ns is None or ns.index.ntotal == 0:
+            return None, slot
+
+        D, I = ns.index.search(vector, 1)
+        entry_id = int(I[0][0])
+        if entry_id == -1 or D[0][0] < SIMILARITY_THRESHOLD:
+            return None, slot
+
+        ns.entries.move_to_end(entry_id)
+        return ns.entries[entry_id], slot
+
+
+def store(slot, response: str):
+    scope, vector = slot
+    with _lock:
+        if scope[-1] != _data_seen:
+            return  # looked up before an ingest; the answer may be stale
+        ns = _namespaces.get(scope)
+        if ns is None:
+            ns = _namespaces[scope] = _Namespace(vector.shape[1])
+
+        entry_id = ns.next_id
+        ns.next_id += 1
+        ns.index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+        ns.entries[entry_id] = response
+
+        if len(ns.entries) > MAX_ENTRIES_PER_NAMESPACE:
+            evicted_id, _ = ns.entries.popitem(last=False)
+            ns.index.remove_ids(np.array([evicted_id], dtype="int64"))
+
+
+def clear():
+    with _lock:
+        _namespaces.clear()
@@ -1,18 +1,34 @@
-import faiss, os, numpy as np, json
+import faiss, os, numpy as np, json, threading
+from collections import OrderedDict
 from core.embeddings import embed
 
 INDEX_PATH = "data/processed/finance.index"
 META_PATH = "data/processed/meta.txt"
 
+# New indexes are HNSW graphs: sub-linear search at a small recall cost.
+# Indexes saved before this stay flat (exact) until re-ingested.
+HNSW_M = 32  # graph neighbours per node
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64  # candidate list size per query; raise for recall
+
 # Module-level singleton cache
 _cached_index = None
 _cached_meta = None
 
+# Search results per normalized query: (largest k searched, results).
+# A cached top-10 also answers any k <= 10 (exact for flat indexes, and the
+# same approximation HNSW would return for the smaller k).
+_search_cache = OrderedDict()
+_SEARCH_CACHE_MAX = 256
+_search_cache_lock = threading.Lock()
+
 def invalidate_cache():
     """Call after save() or add() to force reload on next access."""
     global _cached_index, _cached_meta
     _cached_index = None
     _cached_meta = None
+    with _search_cache_lock:
+        _search_cache.clear()
 
 def load():
     """Load FAISS index + metadata. Uses in-memory cache after first call."""
@@ -24,6 +40,8 @@ def load():
         return None, []
 
     _cached_index = faiss.read_index(INDEX_PATH)
+    if hasattr(_cached_index, "hnsw"):
+        _cached_index.hnsw.efSearch = HNSW_EF_SEARCH
     _cached_meta = [json.loads(line) for line in open(META_PATH).read().splitlines()]
     return _cached_index, _cached_meta
 
@@ -41,7 +59,8 @@ def add(texts, sources):
 
     index, meta = load()
     if index is None:
-        index = faiss.IndexFlatL2(dim)
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
 
     index.add(np.array(vectors).astype("float32"))
 
@@ -50,12 +69,53 @@ def add(texts, sources):
 
     save(index, meta)
 
+def _normalize_query(query):
+    return " ".join(query.lower().split())
+
 def search(query, k=5):
     index, meta = load()
     if index is None:
         return []
 
+    key = _normalize_query(query)
+    with _search_cache_lock:
+        cached = _search_cache.get(key)
+        if cached is not None and cached[0] >= k:
+            _search_cache.move_to_end(key)
+            return cached[1][:k]
+
     qv = embed(query)[0]
     D, I = index.search(np.array([qv]).astype("float32"), k)
 
-    return [meta[i] for i in I[0]]
+    # FAISS pads with -1 when the index holds fewer than k vectors
+    results = [meta[i] for i in I[0] if i >= 0]
+
+    _cache_search(key, k, results)
+    return results
+
+def _cache_search(key, k, results):
+    with _search_cache_lock:
+        _search_cache[key] = (k, results)
+        _search_cache.move_to_end(key)
+        if len(_search_cache) > _SEARCH_CACHE_MAX:
+            _search_cache.popitem(last=False)
+
+def search_batch(queries, k=5):
+    """
+    search() for several queries at once: one embedding request and one
+    FAISS search over the stacked query matrix. Results are cached, so
+    later search() calls for the same queries are cache hits.
+    """
+    index, meta = load()
+    if index is None:
+        return [[] for _ in queries]
+
+    vectors = np.array(embed(list(queries))).astype("float32")
+    D, I = index.search(vectors, k)
+
+    all_results = []
+    for query, row in zip(queries, I):
+        results = [meta[i] for i in row if i >= 0]
+        _cache_search(_normalize_query(query), k, results)
+        all_results.append(results)
+    return all_results
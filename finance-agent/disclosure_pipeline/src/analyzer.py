@@ -4,18 +4,25 @@ Generalized, regime-aware, and signal-safe.
 """
 
 import os
+import asyncio
+import hashlib
 import logging
 import re
 import json
-from collections import defaultdict
+import random
+import weakref
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from google.api_core.exceptions import (
+    DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable
+)
 
+from . import shingles
+from .limiter import GeminiLimiter
 from .models import DisclosureChange, SignalClassification
 
 # ---------------------------------------------------------------------
@@ -107,6 +114,77 @@ Quotes must be verbatim.
 """
 
 
+# Templates are parsed once at import; calls only bind variables.
+COMPARISON_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", """Compare these two versions of the {section} section.
+
+PREVIOUS:
+{text_old}
+
+CURRENT:
+{text_new}
+
+Return JSON:
+{{
+  "changes": [
+    {{
+      "section": "{section}",
+      "quote_old": "...",
+      "quote_new": "...",
+      "description_of_change": "...",
+      "signal_classification": "Positive" | "Negative" | "Noise"
+    }}
+  ]
+}}
+""")
+])
+
+BATCH_COMPARISON_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", """Compare the PREVIOUS and CURRENT versions of the section in each task below.
+Judge every task independently.
+
+Return JSON with one entry per task:
+{{
+  "results": [
+    {{
+      "task_id": <task number>,
+      "changes": [
+        {{
+          "quote_old": "...",
+          "quote_new": "...",
+          "description_of_change": "...",
+          "signal_classification": "Positive" | "Negative" | "Noise"
+        }}
+      ]
+    }}
+  ]
+}}
+
+{tasks}
+""")
+])
+
+VERDICT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a senior investment strategist and credit analyst. 
+Your task is to review a list of quarterly disclosure changes and provide a final synthesis.
+
+Identify the most impactful shifts, ignore the noise, and provide a clear outlook on the company's trajectory.
+"""),
+    ("human", """Review these detected changes in quarterly filings for {company} ({prev_q} -> {curr_q}):
+
+{changes}
+
+Based on these changes, provide:
+1. **Insights & Highlights**: A concise summary of the most important structural shifts and risks.
+2. **Final Verdict**: A clear natural language interpretation of what this means for the company's future.
+3. **Sentiment Signal**: A single label ('Positive', 'Negative', or 'Noise').
+
+Return JSON with keys: 'insights', 'verdict', 'final_signal'.""")
+])
+
+
 # ---------------------------------------------------------------------
 # LLM
 # ---------------------------------------------------------------------
@@ -124,13 +202,162 @@ def create_gemini_llm(temperature: float = 0.1) -> ChatGoogleGenerativeAI:
     )
 
 
+# ---------------------------------------------------------------------
+# Response Parsing
+# ---------------------------------------------------------------------
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def parse_json_object(content: str) -> Optional[Dict]:
+    """
+    Decode the first JSON object in an LLM response.
+
+    Tolerates markdown fences and surrounding prose: decoding starts at the
+    first '{' and stops at the end of that object, in a single linear pass.
+    Stray braces in prose before the JSON are skipped.
+    """
+    start = content.find("{")
+    while start != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(content, start)
+        except json.JSONDecodeError:
+            start = content.find("{", start + 1)
+            continue
+        if isinstance(obj, dict):
+            return obj
+        start = content.find("{", start + 1)
+    return None
+
+
+class _JsonObjectScanner:
+    """
+    Incremental brace-depth tracker over streamed text: reports when the
+    first top-level JSON object closes. Braces inside string literals
+    (including escaped quotes) are ignored.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Consume more text; True once the first object is complete."""
+        for ch in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == "{":
+                self.depth += 1
+                self.started = True
+            elif not self.started:
+                continue  # prose or fences before the object
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
 # ---------------------------------------------------------------------
 # Core Comparison
 # ---------------------------------------------------------------------
 
 MIN_SECTION_LENGTH = 100  # Skip placeholder/empty sections
 
-def compare_sections(
+# Every Gemini call in the process shares one budget, however many companies,
+# pairs and sections are fanned out. Defaults are the Google AI free-tier
+# limits for Flash models; raise them for paid keys. These are separate from
+# vertex.py's GEMINI_CONCURRENCY / GEMINI_RPM, which throttle the agents.
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("DISCLOSURE_GEMINI_CONCURRENCY", "8"))
+GEMINI_RPM = int(os.getenv("DISCLOSURE_GEMINI_RPM", "60"))
+GEMINI_TPM = int(os.getenv("DISCLOSURE_GEMINI_TPM", "100000"))
+
+CHARS_PER_TOKEN = 4  # rough English-prose ratio for budgeting
+
+_limiters = weakref.WeakKeyDictionary()  # event loop -> GeminiLimiter
+
+
+def _llm_slot(prompt_chars: int):
+    """Reserve a call of ~prompt_chars in the running loop's Gemini budget."""
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = GeminiLimiter(GEMINI_RPM, GEMINI_TPM, MAX_CONCURRENT_LLM_CALLS)
+    return limiter.slot(estimated_tokens=prompt_chars // CHARS_PER_TOKEN)
+
+
+# Transient failures worth another attempt; bad requests and auth errors
+# fail immediately
+LLM_MAX_ATTEMPTS = 4
+LLM_RETRY_MAX_DELAY = 30.0
+_RETRYABLE_ERRORS = (
+    ResourceExhausted, ServiceUnavailable, DeadlineExceeded, InternalServerError,
+    ConnectionError, asyncio.TimeoutError,
+)
+
+
+async def _ainvoke_with_retry(chain, payload: Dict, prompt_chars: int):
+    """
+    chain.ainvoke(payload) within the shared budget, retried with jittered
+    exponential backoff. Each attempt takes its own limiter slot, so a 429
+    shrinks the concurrency window before the retry.
+    """
+    return await _with_retry(lambda: chain.ainvoke(payload), prompt_chars)
+
+
+async def _astream_json_with_retry(chain, payload: Dict, prompt_chars: int) -> Tuple[str, Dict]:
+    """
+    Stream chain's response and stop reading once its first top-level JSON
+    object is complete, so trailing prose is never waited for. Returns
+    (text received, usage_metadata if the stream reported any). Same budget
+    and retries as _ainvoke_with_retry.
+    """
+    async def stream():
+        scanner = _JsonObjectScanner()
+        parts, usage = [], {}
+        chunks = chain.astream(payload)
+        try:
+            async for chunk in chunks:
+                text = chunk.content if isinstance(getattr(chunk, "content", None), str) else ""
+                parts.append(text)
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if scanner is not None and scanner.feed(text):
+                    if parse_json_object("".join(parts)) is not None:
+                        break
+                    scanner = None  # braces in prose; read the whole response
+        finally:
+            await chunks.aclose()  # cancels the rest of the generation
+        return "".join(parts), usage
+
+    return await _with_retry(stream, prompt_chars)
+
+
+async def _with_retry(call, prompt_chars: int):
+    for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+        try:
+            async with _llm_slot(prompt_chars):
+                return await call()
+        except _RETRYABLE_ERRORS as e:
+            if attempt == LLM_MAX_ATTEMPTS:
+                raise
+            delay = min(LLM_RETRY_MAX_DELAY, 2 ** (attempt - 1)) + random.uniform(0, 1)
+            logger.warning(
+                f"Gemini call failed (attempt {attempt}/{LLM_MAX_ATTEMPTS}): {e}; "
+                f"retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+
+async def compare_sections(
     section_name: str,
     text_previous: Optional[str],
     text_current: Optional[str],
@@ -144,48 +371,29 @@ def compare_sections(
             or len(text_current) < MIN_SECTION_LENGTH):
         return [], {}
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", SYSTEM_PROMPT),
-        ("human", """Compare these two versions of the {section} section.
-
-PREVIOUS:
-{text_old}
-
-CURRENT:
-{text_new}
-
-Return JSON:
-{{
-  "changes": [
-    {{
-      "section": "{section}",
-      "quote_old": "...",
-      "quote_new": "...",
-      "description_of_change": "...",
-      "signal_classification": "Positive" | "Negative" | "Noise"
-    }}
-  ]
-}}
-""")
-    ])
-
-    chain = prompt | llm
-    response = chain.invoke({
+    chain = COMPARISON_PROMPT | llm
+    text_old = text_previous[:10000]
+    text_new = text_current[:10000]
+    response = await _ainvoke_with_retry(chain, {
         "section": section_name,
-        "text_old": text_previous[:10000],
-        "text_new": text_current[:10000]
-    })
+        "text_old": text_old,
+        "text_new": text_new
+    }, len(SYSTEM_PROMPT) + len(text_old) + len(text_new))
 
     usage = getattr(response, "usage_metadata", {})
     content = response.content if hasattr(response, "content") else str(response)
-    match = re.search(r"\{.*\}", content, re.DOTALL)
-    parsed = json.loads(match.group(0)) if match else {"changes": []}
+    parsed = parse_json_object(content) or {"changes": []}
+
+    return _gate_changes(section_name, parsed.get("changes", [])), usage
 
+
+def _gate_changes(section_name: str, raw_changes: List[Dict]) -> List[DisclosureChange]:
+    """Apply the comparability, dedup and downgrade gates to raw LLM changes."""
     results: List[DisclosureChange] = []
     seen_new = set()
     seen_desc = set()
 
-    for ch in parsed.get("changes", []):
+    for ch in raw_changes:
         quote_old = (ch.get("quote_old") or "").strip()
         quote_new = (ch.get("quote_new") or "").strip()
         desc = (ch.get("description_of_change") or "").strip()
@@ -223,49 +431,130 @@ Return JSON:
             )
         )
 
+    return results
+
+
+# Section comparisons packed into one request. Bounded by task count, by
+# prompt size (~40K tokens) so a batch stays inside one minute's TPM budget,
+# and by expected output so the answer fits gemini-2.0-flash's 8192-token cap
+# (up to 5 changes of two quotes and a description per task).
+MAX_BATCH_TASKS = int(os.getenv("DISCLOSURE_BATCH_SIZE", "25"))
+MAX_BATCH_CHARS = 160_000
+MAX_BATCH_OUTPUT_TOKENS = 8192
+OUTPUT_TOKENS_PER_TASK = 800
+
+
+async def compare_sections_batch(
+    tasks: List[Tuple[str, str, str]],
+    llm: ChatGoogleGenerativeAI
+) -> Tuple[List[List[DisclosureChange]], Dict]:
+    """
+    Compare several (section_name, text_previous, text_current) tasks in one
+    LLM call. Returns (changes per task in input order, usage_metadata).
+    Tasks the model leaves out of its answer (typically a truncated response)
+    are retried in two half-size batches, down to single comparisons.
+    """
+    if len(tasks) == 1:
+        changes, usage = await compare_sections(*tasks[0], llm)
+        return [changes], dict(usage or {})
+
+    blocks = []
+    for task_id, (section_name, text_previous, text_current) in enumerate(tasks):
+        blocks.append(
+            f"<<TASK {task_id}>> {section_name}\n"
+            f"PREVIOUS:\n{text_previous[:10000]}\n\n"
+            f"CURRENT:\n{text_current[:10000]}"
+        )
+    tasks_text = "\n\n".join(blocks)
+
+    chain = BATCH_COMPARISON_PROMPT | llm
+    response = await _ainvoke_with_retry(
+        chain, {"tasks": tasks_text}, len(SYSTEM_PROMPT) + len(tasks_text)
+    )
+
+    usage = dict(getattr(response, "usage_metadata", None) or {})
+    content = response.content if hasattr(response, "content") else str(response)
+    parsed = parse_json_object(content) or {}
+
+    raw_by_task = {}
+    for entry in parsed.get("results", []):
+        if isinstance(entry, dict) and isinstance(entry.get("task_id"), int):
+            raw_by_task[entry["task_id"]] = entry.get("changes") or []
+
+    results: List[Optional[List[DisclosureChange]]] = [None] * len(tasks)
+    unanswered = []
+    for task_id, (section_name, _, _) in enumerate(tasks):
+        if task_id in raw_by_task:
+            results[task_id] = _gate_changes(section_name, raw_by_task[task_id])
+        else:
+            unanswered.append(task_id)
+
+    if unanswered:
+        logger.warning(f"Batch answer missing {len(unanswered)} of {len(tasks)} tasks; retrying them in halves")
+        middle = (len(unanswered) + 1) // 2
+        groups = [g for g in (unanswered[:middle], unanswered[middle:]) if g]
+        retried = await asyncio.gather(*(
+            compare_sections_batch([tasks[i] for i in group], llm) for group in groups
+        ))
+        for group, (changes_per_task, retry_usage) in zip(groups, retried):
+            for task_id, changes in zip(group, changes_per_task):
+                results[task_id] = changes
+            for field in ("input_tokens", "output_tokens", "total_tokens"):
+                usage[field] = usage.get(field, 0) + (retry_usage or {}).get(field, 0)
+
     return results, usage
 
 
+def _batch_tasks(tasks: List[Tuple[str, str, str]]) -> List[List[int]]:
+    """Group task indices into batches within the task, prompt and output budgets."""
+    max_tasks = min(MAX_BATCH_TASKS, MAX_BATCH_OUTPUT_TOKENS // OUTPUT_TOKENS_PER_TASK)
+    batches, current, current_chars = [], [], 0
+    for i, (_, text_previous, text_current) in enumerate(tasks):
+        chars = min(len(text_previous), 10000) + min(len(text_current), 10000)
+        if current and (len(current) >= max_tasks or current_chars + chars > MAX_BATCH_CHARS):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(i)
+        current_chars += chars
+    if current:
+        batches.append(current)
+    return batches
+
+
 # ---------------------------------------------------------------------
 # Quarter Comparison
 # ---------------------------------------------------------------------
 
-def compare_quarters(
+async def compare_quarters(
     company: str,
     quarter_current: str,
     quarter_previous: str,
     data_current: Dict[str, Optional[str]],
     data_previous: Dict[str, Optional[str]],
-    llm: ChatGoogleGenerativeAI
+    llm: ChatGoogleGenerativeAI,
+    sections: Optional[List[str]] = None
 ) -> Tuple[List[DisclosureChange], Dict]:
     """
     Returns (List of changes, aggregate usage_metadata).
-    Runs all 3 section comparisons in parallel for speed.
+    Runs the section comparisons (all 3 unless `sections` is given)
+    concurrently for speed.
     """
     all_changes: List[DisclosureChange] = []
     total_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
 
-    sections = ["MD&A", "Risk_Factors", "Accounting"]
-
-    def compare_one(section):
-        # Create a separate LLM instance per thread for safety
-        section_llm = create_gemini_llm()
-        return compare_sections(
-            section,
-            data_previous.get(section),
-            data_current.get(section),
-            section_llm
-        )
+    if sections is None:
+        sections = ["MD&A", "Risk_Factors", "Accounting"]
 
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {executor.submit(compare_one, s): s for s in sections}
-        for future in futures:
-            changes, usage = future.result()
-            all_changes.extend(changes)
-            if usage:
-                total_usage["input_tokens"] += usage.get("input_tokens", 0)
-                total_usage["output_tokens"] += usage.get("output_tokens", 0)
-                total_usage["total_tokens"] += usage.get("total_tokens", 0)
+    comparisons = [
+        compare_sections(section, data_previous.get(section), data_current.get(section), llm)
+        for section in sections
+    ]
+    for changes, usage in await asyncio.gather(*comparisons):
+        all_changes.extend(changes)
+        if usage:
+            total_usage["input_tokens"] += usage.get("input_tokens", 0)
+            total_usage["output_tokens"] += usage.get("output_tokens", 0)
+            total_usage["total_tokens"] += usage.get("total_tokens", 0)
 
     return all_changes, total_usage
 
@@ -274,7 +563,7 @@ def compare_quarters(
 # Final Verdict Generation
 # ---------------------------------------------------------------------
 
-def generate_final_verdict(results: List[Dict], llm: ChatGoogleGenerativeAI) -> Tuple[Dict, Dict]:
+async def generate_final_verdict(results: List[Dict], llm: ChatGoogleGenerativeAI) -> Tuple[Dict, Dict]:
     """
     Synthesizes the set of changes into a natural language verdict and a final signal.
     """
@@ -294,40 +583,20 @@ def generate_final_verdict(results: List[Dict], llm: ChatGoogleGenerativeAI) ->
     
     changes_text = "\n\n".join(formatted_changes)
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a senior investment strategist and credit analyst. 
-Your task is to review a list of quarterly disclosure changes and provide a final synthesis.
-
-Identify the most impactful shifts, ignore the noise, and provide a clear outlook on the company's trajectory.
-"""),
-        ("human", """Review these detected changes in quarterly filings for {company} ({prev_q} -> {curr_q}):
-
-{changes}
-
-Based on these changes, provide:
-1. **Insights & Highlights**: A concise summary of the most important structural shifts and risks.
-2. **Final Verdict**: A clear natural language interpretation of what this means for the company's future.
-3. **Sentiment Signal**: A single label ('Positive', 'Negative', or 'Noise').
-
-Return JSON with keys: 'insights', 'verdict', 'final_signal'.""")
-    ])
-
-    chain = prompt | llm
+    chain = VERDICT_PROMPT | llm
     
     # We use the first result to get company/quarter info for the prompt
     sample = results[0]
     
-    response = chain.invoke({
+    changes_text = changes_text[:20000] # Safety truncate
+    content, usage = await _astream_json_with_retry(chain, {
         "company": sample["Company"],
         "prev_q": sample["Quarter_Previous"],
         "curr_q": sample["Quarter_Current"],
-        "changes": changes_text[:20000] # Safety truncate
-    })
+        "changes": changes_text
+    }, len(changes_text))
 
-    usage = getattr(response, "usage_metadata", {})
-    content = response.content if hasattr(response, "content") else str(response)
-    match = re.search(r"\{.*\}", content, re.DOTALL)
-    parsed = json.loads(match.group(0)) if match else {
+    parsed = parse_json_object(content) or {
         "insights": "Error parsing LLM response",
         "verdict": content,
         "final_signal": "Noise"
@@ -346,28 +615,113 @@ Return JSON with keys: 'insights', 'verdict', 'final_signal'.""")
 
 ANALYSIS_CACHE_PATH = Path("disclosure_pipeline/output/analysis_cache.json")
 
-def load_analysis_cache() -> Dict:
-    if ANALYSIS_CACHE_PATH.exists():
+
+def _diffs_path() -> Path:
+    """Edit digest per cache key, stored next to the analysis cache."""
+    return ANALYSIS_CACHE_PATH.with_name("analysis_cache_diffs.json")
+
+
+def _load_json(path: Path) -> Dict:
+    if path.exists():
         try:
-            with open(ANALYSIS_CACHE_PATH, 'r') as f:
+            with open(path, 'r') as f:
                 return json.load(f)
         except Exception as e:
             logger.error(f"Failed to load cache: {e}")
     return {}
 
-def save_analysis_cache(cache: Dict):
+def _save_json(path: Path, data: Dict, indent: Optional[int] = 2):
     try:
-        ANALYSIS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(ANALYSIS_CACHE_PATH, 'w') as f:
-            json.dump(cache, f, indent=2)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=indent)
     except Exception as e:
         logger.error(f"Failed to save cache: {e}")
 
-def get_cache_key(company: str, q_prev: str, q_curr: str, section: str) -> str:
-    """Generate a unique key for the cache."""
+def load_analysis_cache() -> Dict:
+    return _load_json(ANALYSIS_CACHE_PATH)
+
+def save_analysis_cache(cache: Dict):
+    _save_json(ANALYSIS_CACHE_PATH, cache)
+
+def _text_digest(text: str) -> str:
+    # Only the first 10000 characters are ever sent to the LLM
+    return hashlib.blake2b(text[:10000].encode("utf-8"), digest_size=8).hexdigest()
+
+
+def get_cache_key(company: str, section: str, text_previous: str, text_current: str) -> str:
+    """
+    Cache key for one section comparison, by content: the same texts hit
+    whatever quarter labels the parser gave them.
+    """
+    return f"{company}|{section}|{_text_digest(text_previous)}|{_text_digest(text_current)}"
+
+
+def _legacy_cache_key(company: str, q_prev: str, q_curr: str, section: str) -> str:
+    """Quarter-label key used by caches written before content keys."""
     return f"{company}|{q_prev}|{q_curr}|{section}"
 
 
+_QUOTE_WS_RE = re.compile(r"\s+")
+
+
+def _quotes_present(changes: List[Dict], text_previous: str, text_current: str) -> bool:
+    """Whether every cached change's quotes occur in these texts (case/space-insensitive)."""
+    def norm(text):
+        return _QUOTE_WS_RE.sub(" ", text).strip().lower()
+
+    haystack_old = norm(text_previous[:10000])
+    haystack_new = norm(text_current[:10000])
+    return all(
+        norm(c["Quote_Old"]) in haystack_old and norm(c["Quote_New"]) in haystack_new
+        for c in changes
+    )
+
+
+def _index_diffs(diffs: Dict[str, str]) -> Dict[Tuple[str, str], List[str]]:
+    """(company|section| prefix, diff digest) -> content cache keys with that diff."""
+    index: Dict[Tuple[str, str], List[str]] = {}
+    for key, diff in diffs.items():
+        company_section = key.rsplit("|", 2)[0] + "|"
+        index.setdefault((company_section, diff), []).append(key)
+    return index
+
+
+def _find_same_edits(
+    cache: Dict,
+    diff_index: Dict[Tuple[str, str], List[str]],
+    key_prefix: str,
+    diff: str,
+    text_previous: str,
+    text_current: str
+) -> Optional[List[Dict]]:
+    """
+    Cached changes of an earlier comparison of the same company and section
+    whose texts differ by exactly the same edits (see shingles.diff_digest).
+    Only non-empty results whose quotes still occur are reused: an empty
+    result is cheap to re-check and must never hide a new disclosure.
+    """
+    for key in diff_index.get((key_prefix, diff), ()):
+        changes = cache.get(key)
+        if changes and _quotes_present(changes, text_previous, text_current):
+            return changes
+    return None
+
+
+def _result_row(company: str, q_prev: str, q_curr: str, change: Dict) -> Dict:
+    """Output row for a section-level change (cached or fresh)."""
+    return {
+        "Company": company,
+        "Quarter_Previous": q_prev,
+        "Quarter_Current": q_curr,
+        "Section": change["Section"],
+        "Quote_Old": change["Quote_Old"],
+        "Quote_New": change["Quote_New"],
+        "Description": change["Description"],
+        "Signal": change["Signal"]
+    }
+
+
 # ---------------------------------------------------------------------
 # Multi-Company Analysis
 # ---------------------------------------------------------------------
@@ -380,24 +734,30 @@ def _has_meaningful_data(quarter_data: Dict[str, Optional[str]]) -> bool:
     )
 
 
-def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[List[Dict], Dict]:
+async def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[List[Dict], Dict]:
     """
     Returns (analysis_summary_dict, aggregate usage_metadata).
-    Quarter pairs are analyzed in parallel. Pairs with empty/placeholder
-    data are skipped entirely.
+    Uncached sections of all quarter pairs are compared in multi-task
+    batches sent concurrently, with every Gemini call held to the shared
+    RPM/TPM/concurrency budget. Pairs with empty/placeholder data are
+    skipped entirely.
     """
     from pathlib import Path
 
+    # One client for the whole run, so every call reuses its warm connections
     llm = None if dry_run else create_gemini_llm()
     results = []
     total_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
 
     # Load cache
     cache = load_analysis_cache()
+    diffs = _load_json(_diffs_path())
+    diff_index = _index_diffs(diffs)
     cache_hits = 0
+    same_edit_hits = 0
 
-    # Collect all quarter pairs across all companies
-    pairs_to_analyze = []
+    # Per quarter pair: cached section changes, plus the sections still to compare
+    pairs = []
 
     for company, quarters_data in parsed_data.items():
         # Filter to quarters with meaningful data, then sort chronologically
@@ -420,69 +780,99 @@ def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[Lis
             if dry_run:
                 continue
 
-            # Check if all sections are cached for this pair
-            sections = ["MD&A", "Risk_Factors", "Accounting"]
-            cached_changes_for_pair = []
-            fully_cached = True
-
-            for section in sections:
-                key = get_cache_key(company, q_prev, q_curr, section)
-                if key not in cache:
-                    fully_cached = False
-                    break
-                cached_changes_for_pair.extend(cache[key])
-
-            if fully_cached:
+            cached_by_section = {}
+            missing = {}  # section -> content cache key
+            for section in ["MD&A", "Risk_Factors", "Accounting"]:
+                text_previous = quarters_data[q_prev].get(section)
+                text_current = quarters_data[q_curr].get(section)
+                if (not text_previous or not text_current
+                        or len(text_previous) < MIN_SECTION_LENGTH
+                        or len(text_current) < MIN_SECTION_LENGTH):
+                    continue  # nothing to compare
+
+                key = get_cache_key(company, section, text_previous, text_current)
+                cached = cache.get(key)
+                if cached is None:
+                    cached = cache.get(_legacy_cache_key(company, q_prev, q_curr, section))
+                    if cached is not None:
+                        cache[key] = cached
+                if cached is None:
+                    diff = shingles.diff_digest(text_previous[:10000], text_current[:10000])
+                    key_prefix = f"{company}|{section}|"
+                    cached = _find_same_edits(
+                        cache, diff_index, key_prefix, diff, text_previous, text_current
+                    )
+                    if key not in diffs:
+                        diff_index.setdefault((key_prefix, diff), []).append(key)
+                    diffs[key] = diff
+                    if cached is not None:
+                        same_edit_hits += 1
+                        cache[key] = cached
+                if cached is None:
+                    missing[section] = key
+                else:
+                    cached_by_section[section] = cached
+
+            if not missing:
                 logger.info(f"Cache hit for {company} {q_prev}->{q_curr}")
                 cache_hits += 1
-                results.extend(cached_changes_for_pair)
-                continue
+            pairs.append((company, q_curr, q_prev, quarters_data, cached_by_section, missing))
+
+    # Flatten the uncached sections of every pair into one task list and send
+    # it in multi-task batches, so request count scales with corpus size / batch
+    task_refs = []  # (pair index, section) per task
+    tasks = []
+    for pair_index, (company, q_curr, q_prev, quarters_data, _, missing) in enumerate(pairs):
+        for section in missing:
+            task_refs.append((pair_index, section))
+            tasks.append((
+                section,
+                quarters_data[q_prev][section],
+                quarters_data[q_curr][section]
+            ))
+
+    task_changes: List[List[DisclosureChange]] = [[] for _ in tasks]
+    if tasks:
+        batches = _batch_tasks(tasks)
+        logger.info(f"Comparing {len(tasks)} sections in {len(batches)} batched requests")
+        batch_outputs = await asyncio.gather(*(
+            compare_sections_batch([tasks[i] for i in batch], llm) for batch in batches
+        ))
+        for batch, (changes_per_task, usage) in zip(batches, batch_outputs):
+            for i, changes in zip(batch, changes_per_task):
+                task_changes[i] = changes
+            total_usage["input_tokens"] += usage.get("input_tokens", 0)
+            total_usage["output_tokens"] += usage.get("output_tokens", 0)
+            total_usage["total_tokens"] += usage.get("total_tokens", 0)
+
+    by_pair = [dict(cached_by_section) for *_, cached_by_section, _ in pairs]
+    for (pair_index, section), changes in zip(task_refs, task_changes):
+        section_changes = [
+            {
+                "Section": c.section,
+                "Quote_Old": c.quote_old,
+                "Quote_New": c.quote_new,
+                "Description": c.description_of_change,
+                "Signal": c.signal_classification.value
+            }
+            for c in changes
+        ]
+        by_pair[pair_index][section] = section_changes
+        cache[pairs[pair_index][5][section]] = section_changes
 
-            pairs_to_analyze.append((company, q_curr, q_prev, quarters_data))
-
-    # Run uncached pairs in parallel
-    if pairs_to_analyze:
-        def analyze_pair(args):
-            company, q_curr, q_prev, quarters_data = args
-            pair_llm = create_gemini_llm()
-            changes, usage = compare_quarters(
-                company, q_curr, q_prev,
-                quarters_data[q_curr], quarters_data[q_prev],
-                pair_llm
-            )
-            pair_results = []
-            for c in changes:
-                pair_results.append({
-                    "Company": company,
-                    "Quarter_Previous": q_prev,
-                    "Quarter_Current": q_curr,
-                    "Section": c.section,
-                    "Quote_Old": c.quote_old,
-                    "Quote_New": c.quote_new,
-                    "Description": c.description_of_change,
-                    "Signal": c.signal_classification.value
-                })
-            return pair_results, usage
-
-        with ThreadPoolExecutor(max_workers=len(pairs_to_analyze)) as executor:
-            futures = [executor.submit(analyze_pair, p) for p in pairs_to_analyze]
-            for future, (company, q_curr, q_prev, _) in zip(futures, pairs_to_analyze):
-                pair_results, usage = future.result()
-                results.extend(pair_results)
-                total_usage["input_tokens"] += usage.get("input_tokens", 0)
-                total_usage["output_tokens"] += usage.get("output_tokens", 0)
-                total_usage["total_tokens"] += usage.get("total_tokens", 0)
-
-                # Update cache
-                by_section = defaultdict(list)
-                for r in pair_results:
-                    by_section[r["Section"]].append(r)
-                for section in ["MD&A", "Risk_Factors", "Accounting"]:
-                    key = get_cache_key(company, q_prev, q_curr, section)
-                    cache[key] = by_section.get(section, [])
+    if pairs:
+        for by_section, (company, q_curr, q_prev, *_) in zip(by_pair, pairs):
+            for section in ["MD&A", "Risk_Factors", "Accounting"]:
+                results.extend(
+                    _result_row(company, q_prev, q_curr, change)
+                    for change in by_section.get(section, [])
+                )
 
         save_analysis_cache(cache)
+        _save_json(_diffs_path(), diffs, indent=None)
 
+    if same_edit_hits:
+        logger.info(f"Reused {same_edit_hits} cached comparisons with identical edits")
     # Global dedup
     final = []
     seen = set()
@@ -498,7 +888,7 @@ def analyze_all_companies(parsed_data: Dict, dry_run: bool = False) -> Tuple[Lis
     # Generate Final Verdict
     if final and not dry_run:
         logger.info("Generating final synthesis and verdict...")
-        verdict, v_usage = generate_final_verdict(final, llm)
+        verdict, v_usage = await generate_final_verdict(final, llm)
 
         total_usage["input_tokens"] += v_usage.get("input_tokens", 0)
         total_usage["output_tokens"] += v_usage.get("output_tokens", 0)
@@ -517,5 +907,5 @@ if __name__ == "__main__":
     with open("output/parsed_data.json") as f:
         data = json.load(f)
 
-    out_data, usage = analyze_all_companies(data, dry_run=True)
+    out_data, usage = asyncio.run(analyze_all_companies(data, dry_run=True))
     print(f"Detected {len(out_data['results'])} changes")
@@ -0,0 +1,104 @@
+"""
+Client-side rate limiting for Gemini calls.
+
+GeminiLimiter keeps requests and estimated tokens within a one-minute
+sliding window (RPM/TPM) and adapts how many calls may be in flight with
+AIMD: halve on a 429, grow back gradually on success.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from google.api_core.exceptions import ResourceExhausted
+
+WINDOW_SECONDS = 60.0
+THROTTLE_PAUSE_SECONDS = 10.0  # hold new calls this long after a 429
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for Gemini quota errors (429 / RESOURCE_EXHAUSTED)."""
+    if isinstance(error, ResourceExhausted):
+        return True
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+class GeminiLimiter:
+    """
+    RPM/TPM budget plus an AIMD concurrency window. Bound to the event
+    loop it is first used on; create one per loop.
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_concurrency: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+
+        self._in_flight = 0
+        self._window = deque()  # (start time, estimated tokens) per call in the last minute
+        self._window_tokens = 0
+        self._paused_until = 0.0
+        self._changed = asyncio.Condition()
+
+    def _expire(self, now: float):
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """0 if a call of `tokens` may start now, else seconds until that could change."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= max(1, int(self.concurrency)):
+            return float("inf")  # until a call finishes
+        # An oversized call still runs once the window is empty
+        if self._window and (len(self._window) >= self.rpm
+                             or self._window_tokens + tokens > self.tpm):
+            return self._window[0][0] + WINDOW_SECONDS - now
+        return 0.0
+
+    async def _acquire(self, tokens: int):
+        async with self._changed:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    break
+                try:
+                    timeout = None if wait == float("inf") else wait
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._in_flight += 1
+            self._window.append((now, tokens))
+            self._window_tokens += tokens
+
+    async def _release(self, succeeded: bool, rate_limited: bool):
+        async with self._changed:
+            self._in_flight -= 1
+            if rate_limited:
+                # Multiplicative decrease, and let the quota window drain
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self._paused_until = time.monotonic() + THROTTLE_PAUSE_SECONDS
+            elif succeeded:
+                # Additive increase: about one more slot per window of successes
+                self.concurrency = min(
+                    float(self.max_concurrency), self.concurrency + 1 / self.concurrency
+                )
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        """Hold one call's share of the budget for the duration of the block."""
+        await self._acquire(estimated_tokens)
+        succeeded = rate_limited = False
+        try:
+            yield
+            succeeded = True
+        except Exception as e:
+            rate_limited = is_rate_limited(e)
+            raise
+        finally:
+            await self._release(succeeded, rate_limited)
@@ -2,6 +2,7 @@
 Main orchestration pipeline for disclosure change analysis.
 """
 import argparse
+import asyncio
 import json
 import logging
 from pathlib import Path
@@ -177,7 +178,7 @@ def run_pipeline(
     if dry_run:
         logger.warning("DRY RUN MODE: Will not make actual LLM API calls")
     
-    analysis_data, usage = analyze_all_companies(parsed_data, dry_run=dry_run)
+    analysis_data, usage = asyncio.run(analyze_all_companies(parsed_data, dry_run=dry_run))
     changes = analysis_data.get("results", [])
     verdict_data = analysis_data.get("verdict")
     
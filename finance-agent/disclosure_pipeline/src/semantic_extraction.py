@@ -5,6 +5,7 @@ Uses Google Gen AI SDK directly for reliable JSON mode extraction.
 import os
 import logging
 import json
+from functools import lru_cache
 from typing import Dict
 from dotenv import load_dotenv
 from google import genai
@@ -92,8 +93,9 @@ an accounting policy, estimate, or calculation method.
 - Do NOT infer or hallucinate information not stated in the transcript"""
 
 
+@lru_cache(maxsize=1)
 def create_genai_client():
-    """Create Google Gen AI client."""
+    """Create Google Gen AI client (one shared client per process)."""
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables")
@@ -0,0 +1,36 @@
+"""
+Word 5-gram shingles for matching section comparisons by their edits.
+
+Two (previous, current) pairs with the same shingles added and removed
+differ only in text both versions share, or in case and whitespace, so
+they present the model with the same changes.
+"""
+import hashlib
+import re
+from typing import Set
+
+SHINGLE_WORDS = 5
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str) -> Set[str]:
+    """Case-insensitive word 5-grams of `text` (one shingle if shorter)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {
+        " ".join(words[i:i + SHINGLE_WORDS])
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def diff_digest(text_previous: str, text_current: str) -> str:
+    """Digest of the shingles added and removed going from previous to current."""
+    old, new = shingles(text_previous), shingles(text_current)
+    h = hashlib.blake2b(digest_size=16)
+    for shingle in sorted(new - old):
+        h.update(b"+" + shingle.encode("utf-8") + b"\n")
+    for shingle in sorted(old - new):
+        h.update(b"-" + shingle.encode("utf-8") + b"\n")
+    return h.hexdigest()
@@ -6,10 +6,10 @@ from tools.research import research_query
 from agents.financial_agent import analyze_financials
 from control.control_plane import run_research_task
 from agents.investment_memo_agent import generate_investment_memo
-from agents.risk_agent import analyze_risks
+from agents.risk_agent import aanalyze_risks
 from agents.competitive_agent import analyze_competition
-from agents.capital_allocation_agent import model_capital_allocation
-from agents.portfolio_agent import analyze_portfolio
+from agents.capital_allocation_agent import amodel_capital_allocation
+from agents.portfolio_agent import aanalyze_portfolio
 from control.research_replay import replay_research, list_research_sessions
 
 from dotenv import load_dotenv
@@ -24,10 +24,11 @@ mcp.add_tool(research_query)
 mcp.add_tool(analyze_financials)
 mcp.add_tool(run_research_task)
 mcp.add_tool(generate_investment_memo)
-mcp.add_tool(analyze_risks)
 mcp.add_tool(analyze_competition)
-mcp.add_tool(model_capital_allocation)
-mcp.add_tool(analyze_portfolio)
+# Async tools: the sync wrappers call asyncio.run, which cannot nest in the server loop
+mcp.add_tool(aanalyze_risks, name="analyze_risks")
+mcp.add_tool(amodel_capital_allocation, name="model_capital_allocation")
+mcp.add_tool(aanalyze_portfolio, name="analyze_portfolio")
 mcp.add_tool(replay_research)
 mcp.add_tool(list_research_sessions)
 
@@ -7,7 +7,7 @@ import json
 import time
 import logging
 import argparse
-from typing import List, Dict
+from typing import Callable, Dict, List, Optional
 from pathlib import Path
 from pydantic import BaseModel, Field
 
@@ -124,7 +124,11 @@ def generate_summary(insights: List[SectionalInsight], company: str, q_prev: str
     return " ".join(all_takeaways[:3])
 
 
-async def run_pipeline(q_prev_path: str, q_curr_path: str) -> Dict:
+async def run_pipeline(
+    q_prev_path: str,
+    q_curr_path: str,
+    on_step: Optional[Callable[[str], None]] = None,
+) -> Dict:
     """
     Main pipeline entry point.
 
@@ -134,8 +138,11 @@ async def run_pipeline(q_prev_path: str, q_curr_path: str) -> Dict:
     4. Compute evasiveness score
     5. Assemble DashboardPayload
 
+    on_step: called with each step's name as it starts (for progress streaming)
+
     Returns: DashboardPayload as dict
     """
+    report_step = on_step or (lambda step: None)
     start = time.time()
     logger.info("\n" + "=" * 60)
     logger.info("MULTI-AGENT ANALYSIS PIPELINE")
@@ -144,6 +151,7 @@ async def run_pipeline(q_prev_path: str, q_curr_path: str) -> Dict:
     # Step 1: Parse PDFs
     step1_start = time.time()
     logger.info("\n[Step 1] Parsing transcripts...")
+    report_step("parse")
     data = load_transcript_pair(q_prev_path, q_curr_path)
     company = data["company"]
     q_prev = data["q_prev"]["quarter"]
@@ -157,6 +165,7 @@ async def run_pipeline(q_prev_path: str, q_curr_path: str) -> Dict:
     # Step 2: Run all agents on BOTH quarters simultaneously
     step2_start = time.time()
     logger.info("\n[Step 2] Running 8 agents (4 per quarter) + evasiveness in parallel...")
+    report_step("extract")
     snapshots_prev, snapshots_curr, evasiveness = await asyncio.gather(
         extract_quarter(text_prev, company, q_prev),
         extract_quarter(text_curr, company, q_curr),
@@ -167,12 +176,14 @@ async def run_pipeline(q_prev_path: str, q_curr_path: str) -> Dict:
     # Step 3: Temporal Delta comparison
     step3_start = time.time()
     logger.info("\n[Step 3] Running Temporal Delta comparisons...")
+    report_step("temporal_delta")
     insights = await run_temporal_comparison(snapshots_prev, snapshots_curr, q_prev, q_curr)
     step3_time = time.time() - step3_start
 
     # Step 4: Validation Agent — cross-check quotes, facts, signals
     step4_start = time.time()
     logger.info("\n[Step 4] Running Validation Agent...")
+    report_step("validation")
     from .agents.validation import validate_insights
     insights, validation_score, flagged_count = await validate_insights(
         insights, text_prev, text_curr, q_prev, q_curr
@@ -182,6 +193,7 @@ async def run_pipeline(q_prev_path: str, q_curr_path: str) -> Dict:
     # Step 5: Market Validation — cross-check against real market data
     step5_start = time.time()
     logger.info("\n[Step 5] Running Market Validation Agent...")
+    report_step("market_validation")
     from .agents.market_validation import market_validate
     from .parser import NSE_TICKERS
     nse_symbol = NSE_TICKERS.get(company)
@@ -192,6 +204,7 @@ async def run_pipeline(q_prev_path: str, q_curr_path: str) -> Dict:
 
     # Step 6: Assemble payload
     logger.info("\n[Step 6] Assembling dashboard payload...")
+    report_step("assemble")
     overall_score, overall_signal = compute_overall_signal(insights)
     summary = generate_summary(insights, company, q_prev, q_curr)
 
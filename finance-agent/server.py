@@ -7,28 +7,50 @@ Start with:
 Mounts all api/ routers under /api/v1 prefix.
 """
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from api.connections import router as connections_router
 from api.analyze import router as analyze_router
 from api.gmail import router as gmail_router
-from api.slack_webhook import router as slack_router
+from api.slack_webhook import aclose_http_client, router as slack_router
+from vertex import warm_up
 
 load_dotenv()
 
 _FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:3000")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The routers import their heavy dependencies (Gemini SDK, pipeline,
+    # Google auth) at module load, so boot pays for them; this also opens the
+    # Gemini connection so the first request doesn't
+    await asyncio.to_thread(warm_up)
+    yield
+    await aclose_http_client()
+
+
 app = FastAPI(
     title="NotionWealth Intelligence Engine API",
     version="2.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# History and analysis responses carry multi-KB JSON payloads of repetitive
+# Markdown; compress them on the wire when the client accepts gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[_FRONTEND_URL],
@@ -1,4 +1,4 @@
-from core.vector import search
+from core.vector import search, search_batch
 
 
 def search_financials(query: str, k: int = 5):
@@ -6,3 +6,11 @@ def search_financials(query: str, k: int = 5):
     Search the finance vector store.
     """
     return search(query, k)
+
+
+def batch_search_financials(queries: list[str], k: int = 5):
+    """
+    Search the finance vector store for several queries with a single
+    embedding request.
+    """
+    return search_batch(queries, k)
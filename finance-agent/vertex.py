@@ -1,44 +1,261 @@
 import os
+import asyncio
+import contextvars
 import hashlib
+import json
+import sqlite3
 import time
+import threading
 from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 
+from core import semantic_cache
+
 load_dotenv()
 
 client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
 
-# In-memory LRU cache for LLM responses (max 128 entries)
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# In-memory LRU cache for LLM responses (max 1024 entries)
 _llm_cache = OrderedDict()
-_LLM_CACHE_MAX = 128
+_LLM_CACHE_MAX = 1024
+_llm_cache_lock = threading.Lock()
+
+# On-disk tier behind the LRU so repeated prompts hit across processes and
+# restarts. Entries expire after a week; set LLM_CACHE_PATH="" to disable.
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "llm_responses.sqlite")
+)
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+# Cleared by exact_cache_only() for templated sub-tasks, whose keys differ
+# only in a company name buried in shared context
+_semantic_cache_enabled = contextvars.ContextVar("semantic_cache_enabled", default=True)
+
+
+# Client-side throttle shared by every online call in the process (sync and
+# async): at most GEMINI_CONCURRENCY requests in flight, started no faster
+# than GEMINI_RPM per minute. Waiting here is cheaper than a 429 + backoff.
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "500"))
+
+
+class _RateLimiter:
+    """
+    Token bucket in GCRA form: `reserve` books the next start slot and
+    returns how long the caller must wait for it, so sync and async callers
+    can share one bucket and sleep in their own way.
+    """
+
+    def __init__(self, per_minute: int, burst: int):
+        self._interval = 60.0 / per_minute
+        self._tolerance = self._interval * (burst - 1)
+        self._tat = 0.0  # theoretical arrival time of the next request
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            self._tat = tat + self._interval
+            return max(0.0, tat - now - self._tolerance)
+
+
+_rate_limiter = _RateLimiter(GEMINI_RPM, burst=GEMINI_CONCURRENCY)
+_in_flight = threading.BoundedSemaphore(GEMINI_CONCURRENCY)
+
+
+@contextmanager
+def _gemini_slot():
+    time.sleep(_rate_limiter.reserve())
+    _in_flight.acquire()
+    try:
+        yield
+    finally:
+        _in_flight.release()
+
+
+@asynccontextmanager
+async def _agemini_slot():
+    await asyncio.sleep(_rate_limiter.reserve())
+    # A threading semaphore so async callers share the cap with threaded
+    # ones (and with other event loops); poll rather than block the loop
+    while not _in_flight.acquire(blocking=False):
+        await asyncio.sleep(0.05)
+    try:
+        yield
+    finally:
+        _in_flight.release()
 
 
 def _prompt_hash(prompt: str) -> str:
-    return hashlib.sha256(prompt.encode()).hexdigest()
+    return hashlib.blake2b(prompt.encode(), digest_size=32).hexdigest()
+
+
+def _response_key(prompt: str, response_schema=None) -> str:
+    """
+    Cache key for a response: the prompt plus everything else that changes
+    the output. Calls use the model's default temperature, so the model and
+    the response schema are the rest of the request.
+    """
+    return _prompt_hash(json.dumps({
+        "model": GEMINI_MODEL,
+        "schema": response_schema.__name__ if response_schema is not None else None,
+        "prompt": prompt,
+    }, sort_keys=True))
 
 
-def call_gemini(prompt: str, use_cache: bool = True, max_retries: int = 3) -> str:
+def _get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None and LLM_CACHE_PATH:
+        try:
+            os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+            conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.commit()
+            _disk_cache = conn
+        except sqlite3.Error as e:
+            print(f"LLM disk cache unavailable: {e}")
+    return _disk_cache
+
+
+def _disk_cache_get(key: str):
+    with _disk_cache_lock:
+        conn = _get_disk_cache()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT response FROM responses WHERE key = ? AND created > ?",
+            (key, time.time() - LLM_CACHE_TTL_SECONDS)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def _disk_cache_put(key: str, response: str):
+    with _disk_cache_lock:
+        conn = _get_disk_cache()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+            (key, response, time.time())
+        )
+        conn.commit()
+
+
+def warm_up():
+    """
+    Open the client's connection (TLS, auth) before the first real request
+    with a model metadata lookup, which generates no tokens.
+    """
+    try:
+        client.models.get(model=GEMINI_MODEL)
+    except Exception as e:
+        print(f"Gemini warm-up failed: {e}")
+
+
+@contextmanager
+def exact_cache_only():
+    """Ignore semantic_key for Gemini calls made inside this block (and the tasks and threads it starts)."""
+    token = _semantic_cache_enabled.set(False)
+    try:
+        yield
+    finally:
+        _semantic_cache_enabled.reset(token)
+
+
+def _cache_lookup(key: str, semantic_key: str, namespace: str):
+    """Returns (cached_response, key, semantic_slot) for a _response_key."""
+    with _llm_cache_lock:
+        cached = _llm_cache.get(key)
+        if cached is not None:
+            _llm_cache.move_to_end(key)
+            return cached, key, None
+
+    cached = _disk_cache_get(key)
+    if cached is not None:
+        _memory_cache_put(key, cached)
+        return cached, key, None
+
+    semantic_slot = None
+    if semantic_key and _semantic_cache_enabled.get():
+        try:
+            cached, semantic_slot = semantic_cache.lookup(namespace, semantic_key)
+            if cached is not None:
+                return cached, key, None
+        except Exception as e:
+            print(f"Semantic cache lookup failed: {e}")
+
+    return None, key, semantic_slot
+
+
+def _memory_cache_put(key: str, response: str):
+    with _llm_cache_lock:
+        _llm_cache[key] = response
+        _llm_cache.move_to_end(key)
+        if len(_llm_cache) > _LLM_CACHE_MAX:
+            _llm_cache.popitem(last=False)
+
+
+def _cache_store(key: str, semantic_slot, result: str):
+    _memory_cache_put(key, result)
+    _disk_cache_put(key, result)
+    if semantic_slot is not None:
+        semantic_cache.store(semantic_slot, result)
+
+
+def _generate_args(prompt: str, response_schema=None):
+    """
+    generate_content kwargs; with response_schema, JSON mode constrained to
+    that schema.
+    """
+    args = {"model": GEMINI_MODEL, "contents": prompt}
+    if response_schema is not None:
+        args["config"] = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=response_schema,
+        )
+    return args
+
+
+def call_gemini(prompt: str, use_cache: bool = True, max_retries: int = 3,
+                semantic_key: str = None, namespace: str = "default",
+                response_schema=None) -> str:
+    """
+    semantic_key: short text (typically the user's task) to match paraphrased
+    repeats against earlier calls in `namespace`. The full prompt is not
+    embedded since it is dominated by retrieved context.
+
+    response_schema: pydantic model the response must conform to (JSON mode).
+    """
     # Check cache
     if use_cache:
-        key = _prompt_hash(prompt)
-        if key in _llm_cache:
-            _llm_cache.move_to_end(key)
-            return _llm_cache[key]
+        cached, key, semantic_slot = _cache_lookup(
+            _response_key(prompt, response_schema), semantic_key, namespace
+        )
+        if cached is not None:
+            return cached
 
     # Call API with retry
     for attempt in range(max_retries):
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt
-            )
+            with _gemini_slot():
+                response = client.models.generate_content(
+                    **_generate_args(prompt, response_schema)
+                )
             result = response.text
 
             if use_cache:
-                _llm_cache[key] = result
-                if len(_llm_cache) > _LLM_CACHE_MAX:
-                    _llm_cache.popitem(last=False)
+                _cache_store(key, semantic_slot, result)
 
             return result
         except Exception as e:
@@ -46,3 +263,82 @@ def call_gemini(prompt: str, use_cache: bool = True, max_retries: int = 3) -> st
                 time.sleep(2 ** attempt)
             else:
                 raise
+
+
+async def acall_gemini(prompt: str, use_cache: bool = True, max_retries: int = 3,
+                       semantic_key: str = None, namespace: str = "default",
+                       response_schema=None) -> str:
+    """Async variant of call_gemini over the client's native aio interface."""
+    if use_cache:
+        # The disk and semantic tiers block on I/O, so keep them off the event loop
+        cached, key, semantic_slot = await asyncio.to_thread(
+            _cache_lookup, _response_key(prompt, response_schema), semantic_key, namespace
+        )
+        if cached is not None:
+            return cached
+
+    for attempt in range(max_retries):
+        try:
+            async with _agemini_slot():
+                response = await client.aio.models.generate_content(
+                    **_generate_args(prompt, response_schema)
+                )
+            result = response.text
+
+            if use_cache:
+                _cache_store(key, semantic_slot, result)
+
+            return result
+        except Exception as e:
+            if attempt < max_retries - 1:
+                await asyncio.sleep(2 ** attempt)
+            else:
+                raise
+
+
+BATCH_TERMINAL_STATES = {
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED",
+}
+
+
+def call_gemini_batch(prompts: list[str], poll_interval: float = 5, use_cache: bool = True) -> list[str]:
+    """
+    Run latency-tolerant prompts through the Gemini batch API (about half the
+    price of online calls, but completes in minutes). Results are returned in
+    prompt order; prompts the batch fails to answer fall back to call_gemini.
+    """
+    results = [None] * len(prompts)
+    pending = []  # (index, prompt_key)
+    for i, prompt in enumerate(prompts):
+        key = _response_key(prompt)
+        cached = _cache_lookup(key, None, None)[0] if use_cache else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append((i, key))
+
+    if pending:
+        job = client.batches.create(
+            model=GEMINI_MODEL,
+            src=[{"contents": [{"parts": [{"text": prompts[i]}], "role": "user"}]} for i, _ in pending],
+        )
+        while job.state.name not in BATCH_TERMINAL_STATES:
+            time.sleep(poll_interval)
+            job = client.batches.get(name=job.name)
+
+        responses = []
+        if job.state.name == "JOB_STATE_SUCCEEDED" and job.dest and job.dest.inlined_responses:
+            responses = job.dest.inlined_responses
+        else:
+            print(f"Batch job {job.name} ended in {job.state.name}; falling back to online calls")
+
+        for n, (i, key) in enumerate(pending):
+            inline = responses[n] if n < len(responses) else None
+            if inline is not None and inline.response is not None:
+                results[i] = inline.response.text
+                if use_cache:
+                    _cache_store(key, None, results[i])
+            else:
+                results[i] = call_gemini(prompts[i], use_cache=use_cache)
+
+    return results
@@ -0,0 +1,24 @@
+-- Most recent analysis results for several users in one round trip.
+-- Called via supabase_admin.rpc() from finance-agent/api/analyze.py.
+CREATE INDEX IF NOT EXISTS idx_analysis_results_user_created
+  ON analysis_results(user_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION recent_analysis_results(user_ids UUID[], per_user INTEGER DEFAULT 20)
+RETURNS TABLE (
+  id             UUID,
+  user_id        UUID,
+  company_ticker TEXT,
+  q_curr         TEXT,
+  payload        JSONB,
+  created_at     TIMESTAMPTZ
+) AS $$
+  SELECT r.id, r.user_id, r.company_ticker, r.q_curr, r.payload, r.created_at
+  FROM (
+    SELECT a.*,
+           row_number() OVER (PARTITION BY a.user_id ORDER BY a.created_at DESC) AS rn
+    FROM analysis_results a
+    WHERE a.user_id = ANY(user_ids)
+  ) r
+  WHERE r.rn <= per_user
+  ORDER BY r.user_id, r.created_at DESC;
+$$ LANGUAGE sql STABLE;